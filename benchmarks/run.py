@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+
+"""Benchmarks of the hot paths of kbtune.
+
+Run all benchmarks, and write the results as JSON::
+
+    python benchmarks/run.py -o results.json
+
+Compare against earlier results, and exit with status 1 if any
+benchmark became slower than the tolerance allows::
+
+    python benchmarks/run.py --compare results.json
+
+Each result is the best time per call, in seconds, over several
+repeats. Batch benchmarks are run for 10^3 up to ``--max-size``
+temperaments.
+"""
+
+from __future__ import division
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+
+import numpy as np
+
+# benchmark the working tree, rather than an installed version
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+import kbtune
+from kbtune import Interval, Note, Temperament
+from kbtune.batch import TemperamentBatch, get_frequencies
+from kbtune.layout import LayoutTemperament, get_division
+
+
+def _get_pythagorean():
+    temp = Temperament()
+    temp.set_frequency(Note('Eb'), 145.73388203017834)
+    temp.tune_fifths_up(Note('Eb'), Note('G#'))
+    return temp
+
+
+def _get_deviations(size):
+    """Random fifth deviations that add up to minus the Pythagorean
+    comma, always the same for the same size.
+    """
+    deviations = np.random.RandomState(0).uniform(-6, 0, (size, 12))
+    deviations -= (np.sum(deviations, axis=1, keepdims=True)
+                   + Temperament.PYTHAGOREAN_COMMA) / 12
+    return deviations
+
+
+def bench_note_parse():
+    return lambda: Note('G#')
+
+
+def bench_note_add():
+    note = Note('G#')
+    fifth = Temperament.PERFECT_FIFTH
+    return lambda: note + fifth
+
+
+def bench_interval():
+    note1, note2 = Note('C#'), Note('G#')
+    return lambda: Interval(note1, note2)
+
+
+def bench_interval_ratio():
+    interval = Interval(Note('C#'), Note('G#'))
+    return interval.get_ratio
+
+
+def bench_tune_fifths_up():
+    temp = Temperament()
+    temp.set_frequency(Note('Eb'), 145.73388203017834)
+    return lambda: temp.tune_fifths_up(Note('Eb'), Note('G#'), -1)
+
+
+def bench_layout_tune_fifths_up():
+    temp = LayoutTemperament(get_division(31))
+    temp.set_frequency(Note('Eb'), 145.73388203017834)
+    return lambda: temp.tune_fifths_up(Note('Eb'), Note('G#'), -1)
+
+
+def bench_get_dev_bps():
+    temp = _get_pythagorean()
+    note1, note2 = Note('C'), Note('E')
+
+    def run():
+        # discard the cached value, to time the calculation itself
+        temp.clear_cache()
+        return temp.get_dev_bps(note1, note2)
+    return run
+
+
+def bench_get_dev_bps_cached():
+    temp = _get_pythagorean()
+    note1, note2 = Note('C'), Note('E')
+    return lambda: temp.get_dev_bps(note1, note2)
+
+
+def bench_str():
+    temp = _get_pythagorean()
+
+    def run():
+        temp.clear_cache()
+        return str(temp)
+    return run
+
+
+def bench_batch_frequencies(size):
+    deviations = _get_deviations(size)
+    return lambda: get_frequencies(deviations)
+
+
+def bench_batch_scores(size):
+    batch = TemperamentBatch(_get_deviations(size))
+    return batch.get_scores
+
+
+BENCHMARKS = [
+    ('note_parse', bench_note_parse),
+    ('note_add', bench_note_add),
+    ('interval', bench_interval),
+    ('interval_ratio', bench_interval_ratio),
+    ('tune_fifths_up', bench_tune_fifths_up),
+    ('layout_tune_fifths_up', bench_layout_tune_fifths_up),
+    ('get_dev_bps', bench_get_dev_bps),
+    ('get_dev_bps_cached', bench_get_dev_bps_cached),
+    ('str', bench_str),
+    ]
+"""Benchmarks of single operations, by name."""
+
+BATCH_BENCHMARKS = [
+    ('batch_frequencies', bench_batch_frequencies),
+    ('batch_scores', bench_batch_scores),
+    ]
+"""Benchmarks of batches, by name, taking the batch size."""
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """Get the best time per call of a function, and the number of
+    calls per repeat.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time or number >= 10 ** 7:
+            break
+        number *= 10
+    return min(timer.repeat(repeat, number)) / number, number
+
+
+def run(names=None, max_size=10 ** 6, repeat=5, min_time=0.2, log=None):
+    """Run the benchmarks, and return the results as a dictionary."""
+    benchmarks = [(name, bench) for name, bench in BENCHMARKS]
+    size = 1000
+    while size <= max_size:
+        for name, bench in BATCH_BENCHMARKS:
+            benchmarks.append((
+                '%s_%i' % (name, size),
+                lambda bench=bench, size=size: bench(size)))
+        size *= 10
+    results = {}
+    for name, bench in benchmarks:
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        seconds, number = measure(bench(), repeat, min_time)
+        results[name] = {'seconds': seconds, 'number': number,
+                         'repeat': repeat}
+        if log is not None:
+            log.write('%-28s %12.3f us\n' % (name, seconds * 1e6))
+    return {
+        'kbtune': kbtune.__version__,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'results': results,
+        }
+
+
+def compare(old, new, tolerance=1.2, log=sys.stdout):
+    """Compare two sets of results, and return the names of the
+    benchmarks that became slower by more than the tolerance factor.
+    """
+    slower = []
+    for name, result in sorted(new['results'].items()):
+        if name not in old['results']:
+            continue
+        ratio = result['seconds'] / old['results'][name]['seconds']
+        if ratio > tolerance:
+            slower.append(name)
+        log.write('%-28s %12.3f us %12.3f us %8.2fx%s\n' % (
+            name, old['results'][name]['seconds'] * 1e6,
+            result['seconds'] * 1e6, ratio,
+            ' slower' if ratio > tolerance else ''))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark kbtune.")
+    parser.add_argument('names', nargs='*',
+                        help="only run benchmarks starting with these names")
+    parser.add_argument('--output', '-o', help="write results to this file")
+    parser.add_argument('--compare', help="compare with results in this file")
+    parser.add_argument('--tolerance', type=float, default=1.2,
+                        help="largest allowed ratio of new to old time")
+    parser.add_argument('--max-size', type=int, default=10 ** 6,
+                        help="largest batch size")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    results = run(args.names, args.max_size, args.repeat, log=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as old:
+            if compare(json.load(old), results, args.tolerance):
+                return 1
+    elif not args.output:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
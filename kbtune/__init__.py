@@ -11,36 +11,9 @@
 from __future__ import division
 
 import math # log
+import weakref
 
-__version__ = '1.0'
-
-# from http://code.activestate.com/recipes/576685/
-# we can import this from functools from Python 2.7 / 3.2 onwards
-def total_ordering(cls):
-    'Class decorator that fills-in missing ordering methods'    
-    convert = {
-        '__lt__': [('__gt__', lambda self, other: other < self),
-                   ('__le__', lambda self, other: not other < self),
-                   ('__ge__', lambda self, other: not self < other)],
-        '__le__': [('__ge__', lambda self, other: other <= self),
-                   ('__lt__', lambda self, other: not other <= self),
-                   ('__gt__', lambda self, other: not self <= other)],
-        '__gt__': [('__lt__', lambda self, other: other > self),
-                   ('__ge__', lambda self, other: not other > self),
-                   ('__le__', lambda self, other: not self > other)],
-        '__ge__': [('__le__', lambda self, other: other >= self),
-                   ('__gt__', lambda self, other: not other >= self),
-                   ('__lt__', lambda self, other: not self >= other)]
-    }
-    roots = set(dir(cls)) & set(convert)
-    assert roots, 'must define at least one ordering operation: < > <= >='
-    root = max(roots)       # prefer __lt __ to __le__ to __gt__ to __ge__
-    for opname, opfunc in convert[root]:
-        if opname not in roots:
-            opfunc.__name__ = opname
-            opfunc.__doc__ = getattr(int, opname).__doc__
-            setattr(cls, opname, opfunc)
-    return cls
+__version__ = '1.1'
 
 def ratio_to_cents(ratio):
     """Convert ratio to cents.
@@ -58,35 +31,190 @@ def cents_to_ratio(cents):
     """
     return 2 ** (cents / 1200)
 
-@total_ordering
-class Note:
-    """Note as key with accidental."""
+class NaturalInterval:
+    """A natural (just) interval, described by the harmonics of the
+    lower and the upper note that coincide at their first common
+    harmonic.
+
+    >>> fifth = NaturalInterval(3, 2)
+    >>> fifth.ratio
+    1.5
+    >>> fifth.cents # doctest: +ELLIPSIS
+    701.955...
+    """
+
+    def __init__(self, lower_harmonic, upper_harmonic):
+        self.lower_harmonic = lower_harmonic
+        """Harmonic of the lower note."""
+        self.upper_harmonic = upper_harmonic
+        """Harmonic of the upper note."""
+        self.ratio = lower_harmonic / upper_harmonic
+        """Frequency ratio of the upper note over the lower note."""
+        self.cents = ratio_to_cents(self.ratio)
+        """Size of the interval in cents."""
+
+NATURAL_INTERVALS = {}
+"""Natural intervals, indexed by key distance and position distance
+(see :class:`Interval`). Use :func:`register_natural_interval` to add
+or to replace intervals.
+"""
+
+_TEMPERAMENTS = weakref.WeakSet()
+"""Live temperaments, whose cached metrics depend on
+:data:`NATURAL_INTERVALS`.
+"""
+
+def register_natural_interval(key_distance, position_distance,
+                              lower_harmonic, upper_harmonic):
+    """Register the natural interval for the given key distance and
+    position distance. The natural interval has frequency ratio
+    *lower_harmonic* / *upper_harmonic*, and beats are counted at
+    the *lower_harmonic* of the lower note. Any previously registered
+    interval for the same distances is replaced. The cached metrics
+    of all temperaments are cleared.
+
+    >>> temp = Temperament()
+    >>> temp.set_frequency(Note('C'), 256)
+    >>> temp.set_frequency(Note('F#'), 352)
+    >>> temp.get_dev_bps(Note('C'), Note('F#'))
+    -96
+    >>> register_natural_interval(3, 6, 11, 8) # 11/8 for aug4
+    >>> Interval(Note('C'), Note('F#')).get_ratio()
+    1.375
+    >>> temp.get_dev_bps(Note('C'), Note('F#'))
+    0
+    >>> register_natural_interval(3, 6, 10, 7) # restore
+    >>> temp.get_dev_bps(Note('C'), Note('F#'))
+    -96
+    """
+    NATURAL_INTERVALS[key_distance, position_distance] = NaturalInterval(
+        lower_harmonic, upper_harmonic)
+    for temperament in list(_TEMPERAMENTS):
+        temperament.clear_cache()
+
+register_natural_interval(0, 0, 1, 1)   # perfect unison
+register_natural_interval(1, 2, 8, 7)   # major second
+register_natural_interval(2, 3, 6, 5)   # minor third
+register_natural_interval(2, 4, 5, 4)   # major third
+register_natural_interval(3, 5, 4, 3)   # perfect fourth
+register_natural_interval(3, 6, 10, 7)  # augmented fourth
+register_natural_interval(4, 6, 7, 5)   # diminished fifth (less than aug4!!)
+register_natural_interval(4, 7, 3, 2)   # perfect fifth
+register_natural_interval(5, 8, 8, 5)   # minor sixth
+register_natural_interval(5, 9, 10, 6)  # major sixth
+register_natural_interval(6, 10, 7, 4)  # minor seventh
+
+class Note(object):
+    """Note as key with accidental.
+
+    Notes are immutable and hashable. Notes whose accidental lies
+    between -2 and +2 are interned, so constructing them again returns
+    the very same object.
+
+    >>> Note('G#') is Note(4, 1)
+    True
+    >>> Note('G#') == Note('Ab')
+    False
+    >>> Note('G#').accidental = 0
+    Traceback (most recent call last):
+        ...
+    AttributeError: Note is immutable.
+
+    .. attribute:: key
+
+       Note (0=C, 1=D, and so on).
+
+    .. attribute:: accidental
+
+       Accidental (-1=b, -2=bb, +1=#, +2=x, and so on).
+
+    .. attribute:: position
+
+       Position (a number between 0 and 11) of the key on the keyboard.
+
+       >>> Note(key=0).position
+       0
+       >>> Note(key=0, accidental=1).position
+       1
+       >>> Note(key=0, accidental=-1).position
+       11
+       >>> Note(key=4, accidental=2).position
+       9
+
+    .. attribute:: octave_offset
+
+       Number of octaves that the note lies above the octave from C to
+       B, so 1 for B#, -1 for Cb, and 0 for most notes.
+
+       >>> Note('B#').octave_offset, Note('Cb').octave_offset
+       (1, -1)
+
+    .. attribute:: index
+
+       Index of the note in the table of interned notes, or ``None``
+       if the note is not interned.
+    """
+    __slots__ = ('key', 'accidental', 'position', 'octave_offset', 'index')
+
     KEYS = {'C': 0, 'D': 1, 'E': 2, 'F': 3, 'G': 4, 'A': 5, 'B': 6}
     KEY_NAMES = {0: 'C', 1: 'D', 2: 'E', 3: 'F', 4: 'G', 5: 'A', 6: 'B'}
     ACCIDENTAL_NAMES = {-2: 'bb', -1: 'b', 0: '', 1: '#', 2: 'x'}
     POSITIONS = {0: 0, 1: 2, 2: 4, 3: 5, 4: 7, 5: 9, 6: 11}
 
-    key = None
-    """Note (0=C, 1=D, and so on)."""
-    accidental = None
-    """Accidental (-1=b, -2=bb, +1=#, +2=x, and so on)."""
+    MAX_ACCIDENTAL = 2
+    """Largest (absolute) accidental of interned notes."""
+
+    _NOTES = []
+    """Interned notes, by index."""
+    _PARSED = {}
+    """Interned notes, by string."""
 
-    def __init__(self, key=6, accidental=0):
+    def __new__(cls, key=6, accidental=0):
         if isinstance(key, str):
-            self.key = self.KEYS[key[0]]
-            self.accidental = accidental
-            for accidental in key[1:]:
-                if accidental == 'b':
-                    self.accidental -= 1
-                elif accidental == '#':
-                    self.accidental += 1
-                elif accidental == 'x':
-                    self.accidental += 2
+            if not accidental:
+                try:
+                    return cls._PARSED[key]
+                except KeyError:
+                    pass
+            name = key
+            key = cls.KEYS[name[0]]
+            for char in name[1:]:
+                if char == 'b':
+                    accidental -= 1
+                elif char == '#':
+                    accidental += 1
+                elif char == 'x':
+                    accidental += 2
                 else:
-                    raise ValueError("Unknown accidental '%s'." % accidental)
+                    raise ValueError("Unknown accidental '%s'." % char)
         elif isinstance(key, int):
-            self.key = key % 7
-            self.accidental = accidental
+            key %= 7
+        else:
+            raise TypeError("Key must be a string or an integer.")
+        if -cls.MAX_ACCIDENTAL <= accidental <= cls.MAX_ACCIDENTAL:
+            try:
+                return cls._NOTES[
+                    key * (2 * cls.MAX_ACCIDENTAL + 1)
+                    + accidental + cls.MAX_ACCIDENTAL]
+            except IndexError:
+                # still building the table
+                index = len(cls._NOTES)
+        else:
+            index = None
+        note = object.__new__(cls)
+        object.__setattr__(note, 'key', key)
+        object.__setattr__(note, 'accidental', accidental)
+        octave_offset, position = divmod(cls.POSITIONS[key] + accidental, 12)
+        object.__setattr__(note, 'position', position)
+        object.__setattr__(note, 'octave_offset', octave_offset)
+        object.__setattr__(note, 'index', index)
+        return note
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Note is immutable.")
+
+    def __reduce__(self):
+        return (Note, (self.key, self.accidental))
 
     def __add__(self, interval):
         """Add an interval to the note.
@@ -97,29 +225,51 @@ class Note:
         A
         >>> print(Note('D') + Interval(Note('C'), Note('E')))
         F#
+        >>> print(Note('B') + Interval(Note('C'), Note('C#')))
+        B#
         """
-        direction = +1 if interval.up else -1
-        # create the new note at the right key, without accidentals for now
-        new_note = Note(self.key + interval.key_distance * direction)
-        # change the accidentals to match the desired position
-        new_note.accidental = (
-            (self.position + interval.position_distance * direction) % 12
-            - new_note.position)
-        return new_note
+        if self.index is not None and interval._transpositions is not None:
+            return interval._transpositions[self.index]
+        return interval._transpose(self)
+
+    def __hash__(self):
+        return hash((self.key, self.accidental))
 
     def __eq__(self, other):
+        """Check whether two notes are spelled alike. Notes are never
+        equal to anything else, even with the same hash.
+
+        >>> Note('C') == Note('C'), Note('C') == Note('B#')
+        (True, False)
+        >>> Note('C') == (0, 0)
+        False
+        """
+        if not isinstance(other, Note):
+            return NotImplemented
         return self.key == other.key and self.accidental == other.accidental
 
     def __ne__(self, other):
         return not(self == other)
 
     def __lt__(self, other):
-        if self.key < other.key:
-            return True
-        elif self.key == other.key:
-            return self.accidental < other.accidental
-        else:
-            return False
+        if not isinstance(other, Note):
+            return NotImplemented
+        return (self.key, self.accidental) < (other.key, other.accidental)
+
+    def __le__(self, other):
+        if not isinstance(other, Note):
+            return NotImplemented
+        return (self.key, self.accidental) <= (other.key, other.accidental)
+
+    def __gt__(self, other):
+        if not isinstance(other, Note):
+            return NotImplemented
+        return (self.key, self.accidental) > (other.key, other.accidental)
+
+    def __ge__(self, other):
+        if not isinstance(other, Note):
+            return NotImplemented
+        return (self.key, self.accidental) >= (other.key, other.accidental)
 
     def __repr__(self):
         """Return string representation.
@@ -157,24 +307,60 @@ class Note:
         return (self.KEY_NAMES[self.key]
                 + self.ACCIDENTAL_NAMES[self.accidental])
 
-    @property
-    def position(self):
-        """Get position (a number between 0 and 11) of a key on the
-        keyboard.
+    def _transpose_by(self, key_distance, position_distance):
+        """Calculate the note that lies the given (signed) number of keys
+        and positions away.
+        """
+        key = (self.key + key_distance) % 7
+        accidental = (
+            (self.position + position_distance - self.POSITIONS[key] + 6)
+            % 12 - 6)
+        return Note(key, accidental)
 
-        >>> Note(key=0).position
-        0
-        >>> Note(key=0, accidental=1).position
-        1
-        >>> Note(key=0, accidental=-1).position
-        11
-        >>> Note(key=4, accidental=2).position
-        9
+    def __format__(self, format_spec):
+        """Format the string representation.
+
+        >>> '{0: <3}|'.format(Note('F#'))
+        'F# |'
         """
-        return (self.POSITIONS[self.key] + self.accidental) % 12
+        return format(str(self), format_spec)
+
+for _key in range(7):
+    for _accidental in range(-Note.MAX_ACCIDENTAL, Note.MAX_ACCIDENTAL + 1):
+        Note._NOTES.append(Note(_key, _accidental))
+for _note in Note._NOTES:
+    Note._PARSED[str(_note)] = _note
+
+class Interval(object):
+    """An interval between two notes.
+
+    Intervals are immutable and hashable. Intervals between interned
+    notes are taken from a precomputed table, as is the result of
+    adding such an interval to an interned note.
+
+    >>> Interval(Note('C'), Note('G')) is Interval(Note('D'), Note('A'))
+    True
+
+    .. attribute:: key_distance
+
+       Number of keys spanned by the interval (0 to 6).
+
+    .. attribute:: position_distance
+
+       Number of positions spanned by the interval. Notes such as B#
+       and Cb count as lying in the next or previous octave.
+
+       >>> Interval(Note('G#'), Note('B#')).position_distance
+       4
+       >>> print(Interval(Note('Cb'), Note('Eb')))
+       +M3
+
+    .. attribute:: up
+
+       Whether the interval goes up.
+    """
+    __slots__ = ('key_distance', 'position_distance', 'up', '_transpositions')
 
-class Interval:
-    """An interval between two notes."""
     NAMES = {
         (0, 0): 'P1',   # perfect unison
         (0, 1): 'aug1', # augmented unison
@@ -202,21 +388,107 @@ class Interval:
         (6, 12): 'aug7',# augmented seventh
         }
 
-    def __init__(self, note1, note2):
+    _TABLE = []
+    """Interned intervals, indexed by the indices of both notes."""
+    _INTERNED = {}
+    """Interned intervals, by key distance, position distance, and
+    direction.
+    """
+
+    def __new__(cls, note1, note2):
+        if note1.index is not None and note2.index is not None:
+            try:
+                return cls._TABLE[note1.index][note2.index]
+            except IndexError:
+                # still building the table
+                pass
         key_distance = note2.key - note1.key
-        position_distance = note2.position - note1.position
+        # B# lies a major third above G#
+        position_distance = (
+            note2.position - note1.position
+            + 12 * (note2.octave_offset - note1.octave_offset))
         if key_distance > 0:
-            self.key_distance = key_distance
-            self.position_distance = position_distance
-            self.up = True
+            up = True
         elif key_distance < 0:
-            self.key_distance = -key_distance
-            self.position_distance = -position_distance
-            self.up = False
-        elif key_distance == 0:
-            self.key_distance = 0
-            self.position_distance = abs(position_distance)
-            self.up = (position_distance >= 0)
+            key_distance = -key_distance
+            position_distance = -position_distance
+            up = False
+        else:
+            up = (position_distance >= 0)
+            position_distance = abs(position_distance)
+        return cls._from_distances(key_distance, position_distance, up)
+
+    @classmethod
+    def _from_distances(cls, key_distance, position_distance, up):
+        """Get the interval with the given distances and direction."""
+        try:
+            return cls._INTERNED[key_distance, position_distance, up]
+        except KeyError:
+            pass
+        interval = object.__new__(cls)
+        object.__setattr__(interval, 'key_distance', key_distance)
+        object.__setattr__(interval, 'position_distance', position_distance)
+        object.__setattr__(interval, 'up', up)
+        object.__setattr__(interval, '_transpositions', None)
+        if len(cls._TABLE) < len(Note._NOTES):
+            # building the table, so intern the interval
+            cls._INTERNED[key_distance, position_distance, up] = interval
+            object.__setattr__(interval, '_transpositions', tuple(
+                interval._transpose(note) for note in Note._NOTES))
+        return interval
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Interval is immutable.")
+
+    def __reduce__(self):
+        return (Interval._from_distances,
+                (self.key_distance, self.position_distance, self.up))
+
+    def _transpose(self, note):
+        """Calculate the note that results from adding this interval to
+        the given note.
+        """
+        direction = 1 if self.up else -1
+        return note._transpose_by(
+            self.key_distance * direction,
+            self.position_distance * direction)
+
+    def __hash__(self):
+        return hash((self.key_distance, self.position_distance, self.up))
+
+    def __eq__(self, other):
+        """Check whether two intervals are alike.
+
+        >>> Interval(Note('C'), Note('E')) == Interval(Note('D'), Note('F#'))
+        True
+        >>> Interval(Note('C'), Note('E')) == (2, 4, True)
+        False
+        """
+        if not isinstance(other, Interval):
+            return NotImplemented
+        return (self.key_distance == other.key_distance
+                and self.position_distance == other.position_distance
+                and self.up == other.up)
+
+    def __ne__(self, other):
+        return not(self == other)
+
+    def get_natural(self):
+        """Get the natural interval from :data:`NATURAL_INTERVALS`,
+        ignoring direction.
+
+        >>> natural = Interval(Note('C'), Note('Bb')).get_natural()
+        >>> natural.lower_harmonic, natural.upper_harmonic
+        (7, 4)
+        >>> Interval(Note('C'), Note('D#')).get_natural().ratio
+        Traceback (most recent call last):
+            ...
+        ValueError: Not a natural interval.
+        """
+        try:
+            return NATURAL_INTERVALS[self.key_distance, self.position_distance]
+        except KeyError:
+            raise ValueError("Not a natural interval.")
 
     def get_ratio(self):
         """Get the ratio of the natural frequencies of the interval.
@@ -226,49 +498,25 @@ class Interval:
         >>> Interval(Note('A'), Note('E')).get_ratio()
         0.75
         """
-        if self.key_distance == 0 and self.position_distance == 0:
-            # perfect unison
-            ratio = 1
-        elif self.key_distance == 1 and self.position_distance == 2:
-            # major second
-            ratio = 8 / 7
-        elif self.key_distance == 2 and self.position_distance == 3:
-            # minor third
-            ratio = 6 / 5
-        elif self.key_distance == 2 and self.position_distance == 4:
-            # major third
-            ratio = 5 / 4
-        elif self.key_distance == 3 and self.position_distance == 5:
-            # perfect fourth
-            ratio = 4 / 3
-        elif self.key_distance == 3 and self.position_distance == 6:
-            # augmented fourth
-            ratio = 10 / 7
-        elif self.key_distance == 4 and self.position_distance == 6:
-            # diminished fifth
-            ratio = 7 / 5 # (is less than augmented fourth!!)
-        elif self.key_distance == 4 and self.position_distance == 7:
-            # perfect fifth
-            ratio = 3 / 2
-        elif self.key_distance == 5 and self.position_distance == 8:
-            # minor sixth
-            ratio = 8 / 5
-        elif self.key_distance == 5 and self.position_distance == 9:
-            # major sixth
-            ratio = 10 / 6
-        elif self.key_distance == 5 and self.position_distance == 9:
-            # minor seventh
-            ratio = 7 / 4
-        else:
-            raise ValueError("Not a natural interval.")
+        ratio = self.get_natural().ratio
         if self.up:
             return ratio
         else:
             return 1 / ratio
-        
 
     def get_cents(self):
-        return ratio_to_cents(self.get_ratio())
+        """Get the (signed) size of the natural interval in cents.
+
+        >>> Interval(Note('E'), Note('B')).get_cents() # doctest: +ELLIPSIS
+        701.955...
+        >>> Interval(Note('A'), Note('E')).get_cents() # doctest: +ELLIPSIS
+        -498.044...
+        """
+        cents = self.get_natural().cents
+        if self.up:
+            return cents
+        else:
+            return -cents
 
     def __str__(self):
         """String representation.
@@ -305,6 +553,9 @@ class Interval:
         return (("+" if self.up else "-")
                 + self.NAMES[(self.key_distance, self.position_distance)])
 
+for _note1 in Note._NOTES:
+    Interval._TABLE.append([Interval(_note1, _note2) for _note2 in Note._NOTES])
+
 class Temperament:
     """A single octave tunable keyboard instrument abstraction.
 
@@ -313,6 +564,8 @@ class Temperament:
 
     >>> Temperament.SYNTONIC_COMMA # doctest: +ELLIPSIS
     21.506...
+    >>> Temperament.PYTHAGOREAN_COMMA # doctest: +ELLIPSIS
+    23.460...
     """
     NOTES = [
         Note(0),     # C
@@ -336,9 +589,77 @@ class Temperament:
     SYNTONIC_COMMA = ratio_to_cents((3 / 2) ** 4 / (2 * 2 * 5 / 4))
     """Four fifths minus two octaves and a third."""
 
+    PYTHAGOREAN_COMMA = ratio_to_cents((3 / 2) ** 12 / 2 ** 7)
+    """Twelve fifths minus seven octaves."""
+
     def __init__(self):
         self.frequencies = [None] * 12
-        """List of frequencies for each note."""
+        """List of frequencies for each note. Change frequencies through
+        :meth:`set_frequency`, so cached interval metrics are kept up to
+        date, or call :meth:`clear_cache` after changing this list.
+        """
+        self.clear_cache()
+
+    def clear_cache(self):
+        """Clear all cached interval metrics.
+
+        Interval metrics are cached, by the indices of both notes. The
+        cache also keeps track of which entries depend on each
+        position, so tuning a note only discards the metrics of
+        intervals that involve that note.
+
+        >>> temp = Temperament()
+        >>> temp.set_frequency(Note('C'), 300)
+        >>> temp.set_frequency(Note('G'), 450)
+        >>> temp.set_frequency(Note('E'), 375)
+        >>> temp.get_dev_cents(Note('C'), Note('G'))
+        0.0
+        >>> temp.get_dev_cents(Note('C'), Note('E'))
+        0.0
+        >>> len(temp._dev_cents)
+        2
+        >>> temp.set_frequency(Note('E'), 380)
+        >>> len(temp._dev_cents)
+        1
+        >>> temp.get_dev_cents(Note('C'), Note('E')) # doctest: +ELLIPSIS
+        22.930...
+        """
+        self._cents = {}
+        """Cached sizes of intervals in cents."""
+        self._dev_cents = {}
+        """Cached deviations of intervals in cents."""
+        self._dev_bps = {}
+        """Cached deviations of intervals in beats per second."""
+        self._dependents = [set() for position in range(12)]
+        """Keys of cached metrics that depend on each position."""
+        _TEMPERAMENTS.add(self)
+
+    def _invalidate(self, position):
+        """Discard the cached metrics of all intervals that involve the
+        given position.
+        """
+        dependents = self._dependents[position]
+        for key in dependents:
+            self._cents.pop(key, None)
+            self._dev_cents.pop(key, None)
+            self._dev_bps.pop(key, None)
+        dependents.clear()
+
+    def _get_cached(self, cache, calc, note1, note2):
+        """Get a metric of an interval from the cache, calculating it if
+        needed. Intervals between notes that are not interned are not
+        cached.
+        """
+        if note1.index is None or note2.index is None:
+            return calc(note1, note2)
+        key = (note1.index, note2.index)
+        try:
+            return cache[key]
+        except KeyError:
+            value = cache[key] = calc(note1, note2)
+            self._dependents[note1.position].add(key)
+            self._dependents[note2.position].add(key)
+            return value
 
     def is_tuned(self, position):
         """Checks whether the note at the given position is tuned.
@@ -361,6 +682,7 @@ class Temperament:
         [None, None, None, None, None, None, None, None, None, 415, None, None]
         """
         self.frequencies[note.position] = freq
+        self._invalidate(note.position)
 
     def get_frequency(self, note):
         """Get frequency of a note.
@@ -373,13 +695,32 @@ class Temperament:
         return self.frequencies[note.position]
 
     def get_cents(self, note1, note2):
-        """Get the (signed) size of the interval in cents."""
+        """Get the (signed) size of the interval in cents.
+
+        >>> temp = Temperament()
+        >>> temp.set_frequency(Note('G#'), 400)
+        >>> temp.set_frequency(Note('C'), 250)
+        >>> temp.set_frequency(Note('B'), 475)
+        >>> round(temp.get_cents(Note('G#'), Note('B#')), 2)
+        386.31
+        >>> round(temp.get_cents(Note('Cb'), Note('Ab')), 2)
+        902.49
+        """
+        return self._get_cached(self._cents, self._calc_cents, note1, note2)
+
+    def _calc_cents(self, note1, note2):
+        # notes such as B# and Cb lie in the next or previous octave
         return ratio_to_cents(
             self.get_frequency(note2)
-            / self.get_frequency(note1))
+            / self.get_frequency(note1)) + 1200 * (
+                note2.octave_offset - note1.octave_offset)
 
     def get_dev_cents(self, note1, note2):
         """Get the deviation of the interval in cents."""
+        return self._get_cached(
+            self._dev_cents, self._calc_dev_cents, note1, note2)
+
+    def _calc_dev_cents(self, note1, note2):
         return (
             self.get_cents(note1, note2)
             - Interval(note1, note2).get_cents())
@@ -388,53 +729,19 @@ class Temperament:
         """Get the difference of the first common harmonic in beats
         per second.
         """
+        return self._get_cached(
+            self._dev_bps, self._calc_dev_bps, note1, note2)
+
+    def _calc_dev_bps(self, note1, note2):
         interval = Interval(note1, note2)
         # check that interval is up, if not, reduce to that case
         if not interval.up:
             return -self.get_dev_bps(note2, note1)
-        # get frequencies
-        freq1 = self.get_frequency(note1)
-        freq2 = self.get_frequency(note2)
-        # calculate difference in first harmonic, in all cases
-        if interval.key_distance == 0 and interval.position_distance == 0:
-            # perfect unison
-            return freq2 - freq1
-        elif interval.key_distance == 1 and interval.position_distance == 2:
-            # major second
-            return 7 * freq2 - 8 * freq1
-        elif interval.key_distance == 2 and interval.position_distance == 3:
-            # minor third
-            return 5 * freq2 - 6 * freq1
-        elif interval.key_distance == 2 and interval.position_distance == 4:
-            # major third
-            ratio = 4 * freq2 - 5 * freq1
-        elif interval.key_distance == 3 and interval.position_distance == 5:
-            # perfect fourth
-            ratio = 3 * freq2 - 4 * freq1
-        elif interval.key_distance == 3 and interval.position_distance == 6:
-            # augmented fourth
-            ratio = 7 * freq2 - 10 * freq1
-        elif interval.key_distance == 4 and interval.position_distance == 6:
-            # diminished fifth
-            ratio = 5 * freq2 - 7 * freq1 # (is less than augmented fourth!!)
-        elif interval.key_distance == 4 and interval.position_distance == 7:
-            # perfect fifth
-            ratio = 2 * freq2 - 3 * freq1
-        elif interval.key_distance == 5 and interval.position_distance == 8:
-            # minor sixth
-            ratio = 5 * freq2 - 8 * freq1
-        elif interval.key_distance == 5 and interval.position_distance == 9:
-            # major sixth
-            ratio = 6 * freq2 - 10 * freq1
-        elif interval.key_distance == 5 and interval.position_distance == 9:
-            # minor seventh
-            ratio = 4 * freq2 - 7 * freq1
-        else:
-            raise ValueError("Not a natural interval.")
-        if interval.up:
-            return ratio
-        else:
-            return 1 / ratio
+        natural = interval.get_natural()
+        return (natural.upper_harmonic * self.get_frequency(note2)
+                * 2 ** note2.octave_offset
+                - natural.lower_harmonic * self.get_frequency(note1)
+                * 2 ** note1.octave_offset)
 
     def get_dev_bpm(self, note1, note2):
         """Get the difference of the first common harmonic in beats
@@ -466,32 +773,91 @@ class Temperament:
         D -A      701.96       0.00       0.00
         <BLANKLINE>
         """
-        result = (
+        header = (
             "      {0: >10} {1: >10} {2: >10}\n"
-            .format("INT/c", "DEV/c", "DEV/bpm"))
-        result += (
-            "      {0: >10} {1: >10} {2: >10}\n"
-            .format("% 1200", "", ""))
-        result += (
-            "------{0:->10}-{1:->10}-{2:->10}\n"
-            .format("", "", ""))
+            "      {3: >10} {4: >10} {5: >10}\n"
+            "------{6:->10}-{6:->10}-{6:->10}\n"
+            .format("INT/c", "DEV/c", "DEV/bpm", "% 1200", "", "", ""))
+        # note: add 1e-8 to avoid -0.00
+        lines = (
+            "{0: <2}-{1: <2} {2: >10.2f} {3: >10.2f} {4: >10.2f}\n"
+            .format(row['note1'], row['note2'],
+                    row['cents'] % 1200 + 1e-8,
+                    row['dev_cents'] + 1e-8,
+                    row['dev_bpm'] + 1e-8)
+            for row in self.iter_rows())
+        return header + ''.join(lines)
+
+    def iter_rows(self, interval=None):
+        """Iterate over the intervals going up from every note, in the
+        order of the circle of fifths starting from A, and yield a
+        dictionary for each, with both notes, and the size in cents,
+        the deviation in cents, and the deviation in beats per second
+        and per minute. By default, the interval is a perfect fifth.
+        When the upper note is spelled below the lower one, as F is
+        below A, it is taken an octave up, as in
+        :func:`kbtune.arrays.get_interval_metrics`.
+
+        >>> temp = Temperament()
+        >>> temp.set_frequency(Note('C'), 300)
+        >>> temp.set_frequency(Note('E'), 375)
+        >>> temp.set_frequency(Note('A'), 500)
+        >>> rows = temp.iter_rows(Temperament.MAJOR_THIRD)
+        >>> row = next(rows)
+        >>> print(row['note1'], row['note2'], row['dev_cents'])
+        A C# None
+        >>> row = next(row for row in rows if row['note1'] == Note('C'))
+        >>> print(row['note1'], row['note2'], row['dev_cents'], row['dev_bps'])
+        C E 0.0 0
+        >>> row = next(row for row in temp.iter_rows(Interval(Note('C'),
+        ...                                                   Note('Ab')))
+        ...            if row['note1'] == Note('E'))
+        >>> print(row['note1'], row['note2'], round(row['cents'], 2))
+        E C 813.69
+        >>> round(row['dev_bps'], 2)
+        0.0
+        """
+        if interval is None:
+            interval = self.PERFECT_FIFTH
         note = Note('A')
-        fifth = Interval(Note('C'), Note('G'))
         while True:
-            next_note = note + fifth
-            # note: add 1e-8 to avoid -0.00
-            result += (
-                "{0: <2}-{1: <2} {2: >10.2f} {3: >10.2f} {4: >10.2f}\n"
-                .format(
-                    note, next_note,
-                    self.get_cents(note, next_note) % 1200 + 1e-8,
-                    self.get_dev_cents(note, next_note) + 1e-8,
-                    self.get_dev_bpm(note, next_note) + 1e-8
-                    ))
-            note = self.NOTES[next_note.position]
+            next_note = note + interval
+            if (self.is_tuned(note.position)
+                    and self.is_tuned(next_note.position)):
+                yield self._get_row(note, next_note, interval)
+            else:
+                yield {'note1': note, 'note2': next_note,
+                       'cents': None, 'dev_cents': None,
+                       'dev_bps': None, 'dev_bpm': None}
+            note = self.NOTES[(note + self.PERFECT_FIFTH).position]
             if note == Note('A'):
                 break
-        return result
+
+    def _get_row(self, note1, note2, interval):
+        """Get the row of :meth:`iter_rows` for an interval going up
+        between two tuned notes.
+        """
+        row = {'note1': note1, 'note2': note2}
+        if not interval.up or Interval(note1, note2).up:
+            row['cents'] = self.get_cents(note1, note2)
+            row['dev_cents'] = self.get_dev_cents(note1, note2)
+            row['dev_bps'] = self.get_dev_bps(note1, note2)
+        else:
+            # the upper note lies in the next octave
+            natural = interval.get_natural()
+            row['cents'] = self.get_cents(note1, note2) + 1200
+            row['dev_cents'] = row['cents'] - natural.cents
+            row['dev_bps'] = self._get_octave_frequency(note1) * (
+                natural.upper_harmonic * cents_to_ratio(row['cents'])
+                - natural.lower_harmonic)
+        row['dev_bpm'] = 60 * row['dev_bps']
+        return row
+
+    def _get_octave_frequency(self, note):
+        """Get the frequency of a note in the octave in which it is
+        spelled.
+        """
+        return self.get_frequency(note) * 2 ** note.octave_offset
 
     def tune_fifth_up(self, note, cents=0):
         """Tune a fifth, and return the tuned note.
@@ -504,15 +870,17 @@ class Temperament:
         337.5
         >>> temp.get_frequency(temp.tune_fifth_up(Note('G#'), -20)) # doctest: +ELLIPSIS
         333.62348...
+        >>> temp.set_frequency(Note('E#'), 400)
+        >>> temp.get_frequency(temp.tune_fifth_up(Note('E#')))
+        300.0
         """
-        ratio = cents_to_ratio(cents)
         next_note = note + self.PERFECT_FIFTH
-        if next_note > note:
-            self.set_frequency(next_note,
-                               ratio * self.get_frequency(note) * (3 / 2))
-        else:
-            self.set_frequency(next_note,
-                               ratio * self.get_frequency(note) / (4 / 3))
+        octaves = note.octave_offset - next_note.octave_offset
+        if not next_note > note:
+            # the fifth lies in the next octave
+            octaves -= 1
+        self.set_frequency(next_note, cents_to_ratio(cents)
+                           * self.get_frequency(note) * (3 / 2 * 2 ** octaves))
         return next_note
 
     def tune_fifths_up(self, note1, note2, cents=0):
@@ -545,6 +913,109 @@ class Temperament:
         self.tune_fifths_up(note, next_note, (cents - self.SYNTONIC_COMMA) / 4)
         return next_note
 
+class CentsTemperament(Temperament):
+    """A temperament that stores the pitch of each note in cents,
+    relative to a reference frequency. Tuning intervals then only
+    needs additions, sizes of intervals only need subtractions, and
+    frequencies are only calculated when asked for.
+
+    >>> temp = CentsTemperament(reference=415)
+    >>> temp.set_frequency(Note('A'), 415)
+    >>> temp.tune_fifths_up(Note('A'), Note('G#'))
+    >>> temp.get_pitch(Note('A'))
+    0.0
+    >>> temp.get_pitch(Note('C#')) # doctest: +ELLIPSIS
+    -792.179...
+    >>> temp.get_dev_cents(Note('A'), Note('C#')) # doctest: +ELLIPSIS
+    21.506...
+    >>> print(round(temp.get_frequency(Note('C#')), 4))
+    262.6172
+    """
+
+    def __init__(self, reference=440):
+        self._reference = reference
+        self.pitches = [None] * 12
+        """List of pitches, in cents relative to the reference, for each
+        note.
+        """
+        self.clear_cache()
+
+    @property
+    def reference(self):
+        """Frequency of pitch zero. Changing it keeps all pitches, so
+        all frequencies change, and clears the cached interval metrics.
+
+        >>> temp = CentsTemperament(reference=400)
+        >>> temp.set_pitch(Note('C'), 0)
+        >>> temp.set_pitch(Note('G'), 700)
+        >>> round(temp.get_dev_bps(Note('C'), Note('G')), 4)
+        -1.3543
+        >>> temp.reference = 800
+        >>> round(temp.get_dev_bps(Note('C'), Note('G')), 4)
+        -2.7087
+        """
+        return self._reference
+
+    @reference.setter
+    def reference(self, reference):
+        self._reference = reference
+        self.clear_cache()
+
+    @property
+    def frequencies(self):
+        """List of frequencies for each note.
+
+        >>> temp = CentsTemperament(reference=400)
+        >>> temp.set_pitch(Note('G#'), 1200)
+        >>> temp.frequencies
+        [None, None, None, None, None, None, None, None, 800.0, None, None, None]
+        """
+        return [None if pitch is None
+                else self.reference * cents_to_ratio(pitch)
+                for pitch in self.pitches]
+
+    def is_tuned(self, position):
+        return self.pitches[position] is not None
+
+    def set_pitch(self, note, cents):
+        """Tune a note at a particular pitch, in cents relative to the
+        reference.
+        """
+        self.pitches[note.position] = cents
+        self._invalidate(note.position)
+
+    def get_pitch(self, note):
+        """Get the pitch of a note, in cents relative to the reference."""
+        return self.pitches[note.position]
+
+    def set_frequency(self, note, freq):
+        self.set_pitch(note, ratio_to_cents(freq / self.reference))
+
+    def get_frequency(self, note):
+        return self.reference * cents_to_ratio(self.get_pitch(note))
+
+    def _calc_cents(self, note1, note2):
+        return self.get_pitch(note2) - self.get_pitch(note1) + 1200 * (
+            note2.octave_offset - note1.octave_offset)
+
+    def tune_fifth_up(self, note, cents=0):
+        """Tune a fifth, and return the tuned note.
+
+        >>> temp = CentsTemperament()
+        >>> temp.set_pitch(Note('C'), 0)
+        >>> temp.tune_fifths_up(Note('C'), Note('B#'))
+        >>> temp.get_pitch(Note('C')) # doctest: +ELLIPSIS
+        23.460...
+        """
+        next_note = note + self.PERFECT_FIFTH
+        octaves = note.octave_offset - next_note.octave_offset
+        if not next_note > note:
+            # the fifth lies in the next octave
+            octaves -= 1
+        self.set_pitch(next_note, self.get_pitch(note) + 1200 * octaves
+                       + self.PERFECT_FIFTH.get_cents() + cents)
+        return next_note
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
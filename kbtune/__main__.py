@@ -0,0 +1,5 @@
+import sys
+
+from kbtune.cli import main
+
+sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+:mod:`kbtune.analysis` -- Pitch and beat analysis
+=================================================
+
+Compare recorded audio against the targets of a temperament. Audio is
+read in fixed size blocks, from a WAV file or from a numpy array, and
+every block is analyzed as soon as it arrives, keeping only a bounded
+window of past samples for measuring beats. This module requires
+numpy.
+
+>>> temp = Temperament()
+>>> temp.set_frequency(Note('A'), 440)
+>>> temp.tune_fifths_up(Note('A'), Note('E'), -2)
+>>> samplerate = 44100
+>>> time = np.arange(3 * samplerate) / samplerate
+>>> samples = np.sin(2 * np.pi * 441 * time)
+>>> tuner = Tuner(temp, samplerate, Note('A'))
+>>> for record in tuner.analyze(iter_array_blocks(samples, 8192)):
+...     pass
+>>> print(round(record['frequency'], 1), round(record['dev_cents'], 1))
+441.0 3.9
+"""
+
+from __future__ import division
+
+import wave
+
+import numpy as np
+
+from kbtune import Interval, Note, Temperament, ratio_to_cents
+
+
+def iter_array_blocks(samples, block_size):
+    """Iterate over consecutive blocks of at most *block_size* samples.
+
+    >>> [len(block) for block in iter_array_blocks(np.zeros(10), 4)]
+    [4, 4, 2]
+    """
+    for start in range(0, len(samples), block_size):
+        yield np.asarray(samples[start:start + block_size], dtype=float)
+
+
+def iter_wav_blocks(filename, block_size):
+    """Iterate over consecutive blocks of at most *block_size* frames of
+    a PCM WAV file, as mono float arrays with values between -1 and 1.
+    Only one block is held in memory at any time. The sample rate is
+    available from :func:`get_wav_samplerate`.
+    """
+    wav = wave.open(filename, 'rb')
+    try:
+        width = wav.getsampwidth()
+        channels = wav.getnchannels()
+        while True:
+            data = wav.readframes(block_size)
+            if not data:
+                break
+            yield _decode(data, width).reshape(-1, channels).mean(axis=1)
+    finally:
+        wav.close()
+
+
+def get_wav_samplerate(filename):
+    """Get the sample rate of a WAV file."""
+    wav = wave.open(filename, 'rb')
+    try:
+        return wav.getframerate()
+    finally:
+        wav.close()
+
+
+def _decode(data, width):
+    """Convert raw little endian PCM data into floats between -1 and 1.
+    Samples of one byte are unsigned.
+
+    >>> print(_decode(bytes([0, 64, 128, 192, 255]), 1))
+    [-1.        -0.5        0.         0.5        0.9921875]
+    >>> print(_decode(b'\\x00\\x80\\x00\\x40', 2))
+    [-1.   0.5]
+    """
+    if width == 1:
+        return (np.frombuffer(data, dtype=np.uint8).astype(np.int16)
+                - 128) / 128
+    if width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        values = (raw[:, 0].astype(np.int32)
+                  | (raw[:, 1].astype(np.int32) << 8)
+                  | (raw[:, 2].astype(np.int32) << 16))
+        return np.where(values >= 1 << 23, values - (1 << 24), values) / (
+            1 << 23)
+    dtype = {2: '<i2', 4: '<i4'}[width]
+    return np.frombuffer(data, dtype=dtype) / float(1 << (8 * width - 1))
+
+
+def _interpolate_peak(spectrum, index):
+    """Refine the location of a peak in a spectrum by fitting a parabola
+    through the logarithms of the peak and its two neighbours.
+    """
+    if index <= 0 or index >= len(spectrum) - 1:
+        return float(index)
+    left, middle, right = np.log(spectrum[index - 1:index + 2] + 1e-30)
+    denominator = left - 2 * middle + right
+    if not denominator:
+        return float(index)
+    return index + 0.5 * (left - right) / denominator
+
+
+def estimate_frequency(samples, samplerate, low, high, padding=4):
+    """Estimate the frequency of the strongest spectral peak between
+    *low* and *high* Hz, using a Hann window, zero padding by the
+    given factor, and parabolic interpolation.
+
+    >>> time = np.arange(4096) / 44100
+    >>> samples = np.sin(2 * np.pi * 261.6 * time)
+    >>> print(round(estimate_frequency(samples, 44100, 200, 300), 1))
+    261.6
+    """
+    size = padding * len(samples)
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples)), size))
+    first = max(int(np.floor(low * size / samplerate)), 1)
+    last = min(int(np.ceil(high * size / samplerate)), len(spectrum) - 1)
+    if last <= first:
+        raise ValueError("Frequency range not resolved.")
+    index = first + int(np.argmax(spectrum[first:last + 1]))
+    return _interpolate_peak(spectrum, index) * samplerate / size
+
+
+def estimate_beat_rate(samples, samplerate, frequency, bandwidth=20,
+                       lowest=0.2):
+    """Estimate the beat rate (in beats per second) of the partials
+    within *bandwidth* Hz of *frequency*, from the strongest
+    fluctuation of their amplitude envelope. Beats slower than
+    *lowest* are ignored, and ``0.0`` is returned if there are none.
+
+    >>> time = np.arange(3 * 44100) / 44100
+    >>> samples = (np.sin(2 * np.pi * 880 * time)
+    ...            + np.sin(2 * np.pi * 883.5 * time))
+    >>> print(round(estimate_beat_rate(samples, 44100, 880), 1))
+    3.5
+    """
+    size = len(samples)
+    spectrum = np.fft.fft(samples * np.hanning(size))
+    freqs = np.fft.fftfreq(size, 1 / samplerate)
+    # analytic signal of the band around the partial
+    spectrum[np.abs(freqs - frequency) > bandwidth] = 0
+    envelope = np.abs(np.fft.ifft(spectrum))
+    window = np.hanning(size) > 0.5
+    envelope = envelope[window] - np.mean(envelope[window])
+    padded = 8 * len(envelope)
+    fluctuation = np.abs(np.fft.rfft(envelope * np.hanning(len(envelope)),
+                                     padded))
+    first = int(np.ceil(lowest * padded / samplerate))
+    last = min(int(bandwidth * padded / samplerate), len(fluctuation) - 1)
+    if last <= first or not np.any(fluctuation[first:last + 1]):
+        return 0.0
+    index = first + int(np.argmax(fluctuation[first:last + 1]))
+    return _interpolate_peak(fluctuation, index) * samplerate / padded
+
+
+class Tuner:
+    """Analyze a stream of audio blocks of a *note*, or of an interval
+    between *note* and *note2* when given, against the targets of
+    *temperament*. The played notes sound *octave* octaves above the
+    frequencies of the temperament. Beats are measured over the last
+    *beat_window* seconds.
+    """
+
+    def __init__(self, temperament, samplerate, note, note2=None, octave=0,
+                 beat_window=2.0, bandwidth=20):
+        self.temperament = temperament
+        self.samplerate = samplerate
+        self.note = note
+        self.note2 = note2
+        self.bandwidth = bandwidth
+        self.scale = 2 ** octave
+        self.target = self.scale * temperament.get_frequency(note)
+        """Target frequency of the (first) note."""
+        self.expected_beats = None
+        """Expected beat rate of the interval, in beats per second."""
+        if note2 is not None:
+            interval = Interval(note, note2)
+            lower, upper = (note, note2) if interval.up else (note2, note)
+            self.partial = (
+                interval.get_natural().lower_harmonic
+                * self.scale * temperament.get_frequency(lower))
+            self.expected_beats = (
+                self.scale * temperament.get_dev_bps(lower, upper))
+        self._history = np.zeros(int(beat_window * samplerate))
+        self._filled = 0
+
+    def process(self, block):
+        """Analyze one block of samples, and return a dictionary with
+        the measured ``'frequency'`` of the note, its deviation
+        ``'dev_cents'`` from the target, and, for intervals, the
+        measured ``'beats'`` and ``'expected_beats'`` (both absolute
+        values, in beats per second), once enough samples have been
+        collected. The frequency and its deviation are ``None`` for
+        blocks too short to tell the note from its neighbours, such as
+        the last block of a stream.
+
+        >>> temp = Temperament()
+        >>> temp.set_frequency(Note('A'), 440)
+        >>> time = np.arange(2 * 8192 + 10) / 44100
+        >>> samples = np.sin(2 * np.pi * 440 * time)
+        >>> tuner = Tuner(temp, 44100, Note('A'))
+        >>> records = list(tuner.analyze(iter_array_blocks(samples, 8192)))
+        >>> print(round(records[0]['frequency'], 1), records[-1]['frequency'])
+        440.0 None
+        """
+        block = np.asarray(block, dtype=float)
+        low = self.target * 2 ** (-1 / 12)
+        high = self.target * 2 ** (1 / 12)
+        try:
+            frequency = estimate_frequency(block, self.samplerate, low, high)
+        except ValueError:
+            record = {'frequency': None, 'dev_cents': None}
+        else:
+            record = {'frequency': frequency,
+                      'dev_cents': ratio_to_cents(frequency / self.target)}
+        if self.note2 is not None:
+            history = self._history
+            if len(block) >= len(history):
+                history[:] = block[-len(history):]
+            else:
+                history[:-len(block)] = history[len(block):]
+                history[-len(block):] = block
+            self._filled = min(self._filled + len(block), len(history))
+            record['expected_beats'] = abs(self.expected_beats)
+            if self._filled == len(history):
+                record['beats'] = estimate_beat_rate(
+                    history, self.samplerate, self.partial, self.bandwidth)
+            else:
+                record['beats'] = None
+        return record
+
+    def analyze(self, blocks):
+        """Process a stream of blocks, yielding one record per block, as
+        returned by :meth:`process`, with the ``'time'`` (in seconds)
+        at the end of the block added.
+
+        >>> temp = Temperament()
+        >>> temp.set_frequency(Note('C'), 261.6)
+        >>> temp.tune_major_third_up(Note('C'))
+        Note(key=2)
+        >>> c, e = 261.6, 261.6 * 2 ** (400 / 1200)
+        >>> time = np.arange(3 * 44100) / 44100
+        >>> samples = sum(np.sin(2 * np.pi * n * f * time)
+        ...               for f in (c, e) for n in range(1, 6))
+        >>> tuner = Tuner(temp, 44100, Note('C'), Note('E'))
+        >>> records = list(tuner.analyze(iter_array_blocks(samples, 8192)))
+        >>> print(records[0]['beats'], round(records[-1]['beats'], 1))
+        None 10.4
+        >>> print(round(records[-1]['expected_beats'], 6))
+        0.0
+        """
+        time = 0
+        for block in blocks:
+            time += len(block) / self.samplerate
+            record = self.process(block)
+            record['time'] = time
+            yield record
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
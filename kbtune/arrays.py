@@ -0,0 +1,135 @@
+"""
+:mod:`kbtune.arrays` -- Vectorized interval metrics
+===================================================
+
+Array backed temperaments, for scoring many intervals in one go.
+This module requires numpy.
+
+>>> temp = ArrayTemperament()
+>>> temp.set_frequency(Note('Eb'), 145.73388203017834)
+>>> temp.tune_fifths_up(Note('Eb'), Note('G#'))
+>>> cents, dev_cents, dev_bps = temp.get_metrics()
+>>> cents.shape
+(3, 12)
+>>> print(np.round(dev_cents[0], 2) + 0)
+[  0.     0.     0.     0.     0.     0.     0.     0.   -23.46   0.
+   0.     0.  ]
+"""
+
+from __future__ import division
+
+import numpy as np
+
+from kbtune import NATURAL_INTERVALS, Interval, Note, Temperament
+
+INTERVALS = ('P5', 'M3', 'm3')
+"""Names of the intervals evaluated by :meth:`ArrayTemperament.get_metrics`."""
+
+_DISTANCES = dict(
+    (name, distance) for distance, name in Interval.NAMES.items())
+
+
+def get_interval_table(intervals=INTERVALS):
+    """Get size in keys, natural size in cents, harmonic of the lower
+    note, and harmonic of the upper note, of the named intervals, as
+    arrays. The values are taken from :data:`NATURAL_INTERVALS`, so
+    registered intervals are picked up too.
+
+    >>> semitones, cents, lower, upper = get_interval_table(['P5', 'm7'])
+    >>> semitones, lower, upper
+    (array([ 7, 10]), array([3, 7]), array([2, 4]))
+    >>> print(np.round(cents, 2))
+    [701.96 968.83]
+    """
+    distances = [_DISTANCES[name] for name in intervals]
+    naturals = [NATURAL_INTERVALS[distance] for distance in distances]
+    return (
+        np.array([position_distance for _, position_distance in distances]),
+        np.array([natural.cents for natural in naturals]),
+        np.array([natural.lower_harmonic for natural in naturals]),
+        np.array([natural.upper_harmonic for natural in naturals]))
+
+
+def get_interval_metrics(frequencies, intervals=INTERVALS):
+    """Get size in cents, deviation in cents, and deviation in beats
+    per second, of the named intervals, going up from every position
+    of the octave. Intervals that reach beyond the octave use the
+    frequency of the target note one octave higher, which gives the
+    same values as :meth:`Temperament.get_cents`,
+    :meth:`Temperament.get_dev_cents`, and
+    :meth:`Temperament.get_dev_bps` modulo the octave.
+
+    The frequencies can have any leading shape, as long as the last
+    axis holds the twelve positions. The results have shape
+    ``frequencies.shape[:-1] + (len(intervals), 12)``.
+
+    >>> freqs = [300 * 2 ** (i / 12) for i in range(12)]
+    >>> cents, dev_cents, dev_bps = get_interval_metrics(freqs)
+    >>> print(np.round(cents[:, 0], 2))
+    [700. 400. 300.]
+    >>> print(np.round(dev_cents[:, 0], 2))
+    [ -1.96  13.69 -15.64]
+    >>> print(np.round(dev_bps[:, 0], 2))
+    [ -1.02  11.91 -16.19]
+    """
+    semitones, natural_cents, lower_harmonics, upper_harmonics = (
+        get_interval_table(intervals))
+    frequencies = np.asarray(frequencies, dtype=float)
+    second = np.arange(12) + semitones[:, np.newaxis]
+    freq1 = frequencies[..., np.newaxis, :]
+    freq2 = frequencies[..., second % 12] * 2.0 ** (second // 12)
+    cents = 1200 * np.log2(freq2 / freq1)
+    dev_cents = cents - natural_cents[:, np.newaxis]
+    dev_bps = (upper_harmonics[:, np.newaxis] * freq2
+               - lower_harmonics[:, np.newaxis] * freq1)
+    return cents, dev_cents, dev_bps
+
+
+class ArrayTemperament(Temperament):
+    """A temperament whose frequencies are stored in a numpy array.
+    Untuned notes have frequency ``nan``.
+
+    >>> temp = ArrayTemperament()
+    >>> temp.is_tuned(9)
+    False
+    >>> temp.set_frequency(Note('A'), 415)
+    >>> temp.is_tuned(9)
+    True
+    """
+
+    def __init__(self, frequencies=None):
+        if frequencies is None:
+            self.frequencies = np.full(12, np.nan)
+        else:
+            self.frequencies = np.array(frequencies, dtype=float)
+        self.clear_cache()
+
+    def is_tuned(self, position):
+        return not np.isnan(self.frequencies[position])
+
+    def get_metrics(self):
+        """Get size in cents, deviation in cents, and deviation in
+        beats per second, of all fifths, major thirds, and minor
+        thirds, as three arrays of shape ``(3, 12)``. Rows follow
+        :data:`INTERVALS`, and column ``i`` holds the interval going
+        up from ``Temperament.NOTES[i]``.
+
+        >>> temp = ArrayTemperament()
+        >>> temp.set_frequency(Note('Eb'), 150)
+        >>> temp.tune_fifths_up(Note('Eb'), Note('G#'), -2)
+        >>> cents, dev_cents, dev_bps = temp.get_metrics()
+        >>> fifths = [temp.get_dev_bps(note, note + Temperament.PERFECT_FIFTH)
+        ...           for note in Temperament.NOTES]
+        >>> bool(np.allclose(dev_bps[0], fifths))
+        True
+        >>> minor_third = Interval(Note('E'), Note('G'))
+        >>> thirds = [temp.get_dev_cents(note, note + minor_third)
+        ...           for note in Temperament.NOTES]
+        >>> bool(np.allclose(dev_cents[2], thirds))
+        True
+        """
+        return get_interval_metrics(self.frequencies)
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
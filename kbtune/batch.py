@@ -0,0 +1,227 @@
+"""
+:mod:`kbtune.batch` -- Batches of temperaments
+==============================================
+
+Evaluate many temperaments at once. Each temperament is given by the
+deviations in cents of its twelve fifths, which add up to minus the
+Pythagorean comma. This module requires numpy.
+
+>>> deviations = np.zeros((3, 12))
+>>> deviations[0] = -Temperament.PYTHAGOREAN_COMMA / 12     # equal
+>>> deviations[1, Note('G#').position] = -Temperament.PYTHAGOREAN_COMMA
+>>> deviations[2, [0, 2, 7, 9]] = -Temperament.PYTHAGOREAN_COMMA / 4
+>>> batch = TemperamentBatch(deviations)
+>>> scores = batch.get_scores()
+>>> print(np.round(scores['M3_mean_cents'], 2))
+[13.69 14.99 14.01]
+>>> print(np.round(scores['P5_max_cents'], 2))
+[ 1.96 23.46  5.87]
+"""
+
+from __future__ import division
+
+import numpy as np
+
+from kbtune import Note, Temperament
+from kbtune.arrays import (ArrayTemperament, get_interval_metrics,
+                           get_interval_table)
+
+CIRCLE = np.arange(12) * 7 % 12
+"""Positions in the circle of fifths, starting from C."""
+
+STATISTICS = ('mean_cents', 'max_cents', 'rms_cents', 'rms_bps')
+"""Statistics of the deviations calculated by
+:meth:`TemperamentBatch.get_scores`.
+"""
+
+
+def get_frequencies(deviations, note=Note('A'), frequency=415):
+    """Calculate the frequencies of temperaments from the deviations
+    of their fifths. Column ``i`` of *deviations* holds the deviation
+    of the fifth going up from ``Temperament.NOTES[i]``. Deviations
+    can have any leading shape.
+
+    >>> deviations = np.zeros(12)
+    >>> deviations[Note('G#').position] = -Temperament.PYTHAGOREAN_COMMA
+    >>> temp = Temperament()
+    >>> temp.set_frequency(Note('Eb'), 1)
+    >>> temp.tune_fifths_up(Note('Eb'), Note('G#'))
+    >>> freqs = get_frequencies(deviations, Note('Eb'), 1)
+    >>> bool(np.allclose(freqs, temp.frequencies))
+    True
+    """
+    deviations = np.asarray(deviations, dtype=float)
+    # sizes of the first eleven fifths of the circle, starting from C
+    fifths = (deviations[..., CIRCLE[:-1]]
+              + Temperament.PERFECT_FIFTH.get_cents())
+    cents = np.zeros(deviations.shape)
+    cents[..., CIRCLE[1:]] = (
+        np.cumsum(fifths, axis=-1) - 1200 * (np.arange(1, 12) * 7 // 12))
+    return frequency * 2 ** (
+        (cents - cents[..., note.position, np.newaxis]) / 1200)
+
+
+def get_jacobian(deviations, intervals=('P5', 'M3', 'm3'), note=Note('A'),
+                 frequency=415):
+    """Calculate the derivatives of the deviations in cents, and in
+    beats per second, of the named intervals, with respect to the
+    deviations of the fifths, for temperaments given as by
+    :func:`get_frequencies`. The pitch of *note* stays fixed, and the
+    last fifth of the circle, going up from F, closes the circle, so
+    the column of that fifth is zero.
+
+    Both results have shape
+    ``deviations.shape[:-1] + (len(intervals), 12, 12)``, where element
+    ``[..., i, p, q]`` is the derivative of interval ``i`` going up from
+    ``Temperament.NOTES[p]``, as by
+    :func:`kbtune.arrays.get_interval_metrics`, with respect to the
+    fifth going up from ``Temperament.NOTES[q]``. Deviations in cents
+    depend linearly on the deviations of the fifths, so their
+    derivatives are the same for all temperaments.
+
+    >>> deviations = np.zeros(12) - Temperament.PYTHAGOREAN_COMMA / 12
+    >>> d_cents, d_bps = get_jacobian(deviations)
+    >>> d_cents.shape
+    (3, 12, 12)
+    >>> C, E, F, G = [note.position for note in map(Note, 'CEFG')]
+    >>> print(d_cents[1, C, [C, G, F]])
+    [1. 1. 0.]
+    >>> print(d_cents[0, F, [C, F]])
+    [-1.  0.]
+
+    Beat rates change as predicted by the derivatives:
+
+    >>> step = np.zeros(12)
+    >>> step[G] = 1e-3
+    >>> bps = [get_interval_metrics(get_frequencies(deviations + step * sign))[2]
+    ...        for sign in (-1, 1)]
+    >>> bool(np.allclose((bps[1] - bps[0]) / 2e-3, d_bps[..., G]))
+    True
+    """
+    deviations = np.asarray(deviations, dtype=float)
+    semitones, _, lower_harmonics, upper_harmonics = (
+        get_interval_table(intervals))
+    # derivatives of the pitches, in cents, with respect to the fifths
+    pitches = np.zeros((12, 12))
+    for i in range(1, 12):
+        pitches[CIRCLE[i], CIRCLE[:i]] = 1
+    pitches -= pitches[note.position].copy()
+    second = (np.arange(12) + semitones[:, np.newaxis]) % 12
+    d_cents = pitches[second] - pitches
+    freqs = get_frequencies(deviations, note, frequency)
+    octaves = 2.0 ** ((np.arange(12) + semitones[:, np.newaxis]) // 12)
+    freq1 = freqs[..., np.newaxis, :, np.newaxis]
+    freq2 = (freqs[..., second] * octaves)[..., np.newaxis]
+    d_bps = np.log(2) / 1200 * (
+        upper_harmonics[:, np.newaxis, np.newaxis] * freq2 * pitches[second]
+        - lower_harmonics[:, np.newaxis, np.newaxis] * freq1 * pitches)
+    return (np.broadcast_to(d_cents, deviations.shape[:-1] + d_cents.shape),
+            d_bps)
+
+
+class TemperamentBatch:
+    """A batch of temperaments, given by the deviations of their fifths,
+    as an array (or memory map) of shape ``(N, 12)``. Column ``i``
+    holds the deviation of the fifth going up from
+    ``Temperament.NOTES[i]``. All calculations are done in chunks of
+    *chunk_size* temperaments, to keep memory use bounded.
+
+    >>> TemperamentBatch(np.zeros((2, 12)))
+    Traceback (most recent call last):
+        ...
+    ValueError: Fifths must add up to minus the Pythagorean comma.
+    """
+
+    def __init__(self, deviations, note=Note('A'), frequency=415,
+                 chunk_size=16384):
+        self.deviations = deviations
+        """Deviations of the fifths in cents."""
+        self.note = note
+        """Reference note."""
+        self.frequency = frequency
+        """Frequency of the reference note."""
+        self.chunk_size = chunk_size
+        """Number of temperaments processed at once."""
+        for start, stop in self.iter_chunks():
+            if not np.allclose(
+                    np.sum(self.deviations[start:stop], axis=-1),
+                    -Temperament.PYTHAGOREAN_COMMA):
+                raise ValueError(
+                    "Fifths must add up to minus the Pythagorean comma.")
+
+    def __len__(self):
+        return len(self.deviations)
+
+    def iter_chunks(self):
+        """Iterate over start and stop index of all chunks.
+
+        >>> deviations = np.zeros((5, 12)) - Temperament.PYTHAGOREAN_COMMA / 12
+        >>> list(TemperamentBatch(deviations, chunk_size=2).iter_chunks())
+        [(0, 2), (2, 4), (4, 5)]
+        """
+        for start in range(0, len(self), self.chunk_size):
+            yield start, min(start + self.chunk_size, len(self))
+
+    def get_frequencies(self, start=0, stop=None):
+        """Get the frequencies of the given range of temperaments, as an
+        array of shape ``(stop - start, 12)``.
+        """
+        return get_frequencies(
+            self.deviations[start:stop], self.note, self.frequency)
+
+    def get_jacobian(self, start=0, stop=None, intervals=('P5', 'M3', 'm3')):
+        """Get the derivatives of the deviations of the named intervals
+        with respect to the deviations of the fifths, for the given range
+        of temperaments, as by :func:`get_jacobian`.
+        """
+        return get_jacobian(self.deviations[start:stop], intervals,
+                            self.note, self.frequency)
+
+    def get_temperament(self, index):
+        """Get a single temperament of the batch.
+
+        >>> deviations = np.zeros((1, 12)) - Temperament.PYTHAGOREAN_COMMA / 12
+        >>> temp = TemperamentBatch(deviations).get_temperament(0)
+        >>> print(round(temp.get_dev_cents(Note('C'), Note('E')), 2))
+        13.69
+        """
+        return ArrayTemperament(self.get_frequencies(index, index + 1)[0])
+
+    def iter_metrics(self, intervals=('P5', 'M3', 'm3')):
+        """Iterate over all chunks, yielding start index, stop index, and
+        size in cents, deviation in cents, and deviation in beats per
+        second of the named intervals, as by
+        :func:`kbtune.arrays.get_interval_metrics`.
+        """
+        for start, stop in self.iter_chunks():
+            cents, dev_cents, dev_bps = get_interval_metrics(
+                self.get_frequencies(start, stop), intervals)
+            yield start, stop, cents, dev_cents, dev_bps
+
+    def get_scores(self, intervals=('P5', 'M3', 'm3')):
+        """Get summary scores of all temperaments, as a structured array
+        of length N with, for every named interval, a field for each of
+        the :data:`STATISTICS` of the absolute deviations over all twelve
+        intervals, such as ``'M3_max_cents'``.
+        """
+        dtype = [('%s_%s' % (name, stat), float)
+                 for name in intervals for stat in STATISTICS]
+        scores = np.empty(len(self), dtype=dtype)
+        for start, stop, cents, dev_cents, dev_bps in self.iter_metrics(
+                intervals):
+            abs_cents = np.abs(dev_cents)
+            values = {
+                'mean_cents': np.mean(abs_cents, axis=-1),
+                'max_cents': np.max(abs_cents, axis=-1),
+                'rms_cents': np.sqrt(np.mean(dev_cents ** 2, axis=-1)),
+                'rms_bps': np.sqrt(np.mean(dev_bps ** 2, axis=-1)),
+                }
+            for i, name in enumerate(intervals):
+                for stat in STATISTICS:
+                    scores['%s_%s' % (name, stat)][start:stop] = (
+                        values[stat][:, i])
+        return scores
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,158 @@
+"""
+:mod:`kbtune.catalog` -- Temperament catalogs
+=============================================
+
+A catalog stores many temperaments on disk, each as a scale of twelve
+pitches in cents relative to C (see :mod:`kbtune.scala`), together
+with a name and a dictionary of attributes. The scales are kept in a
+binary file that is memory mapped, so opening a catalog does not read
+them. Names and attributes are kept in a small index file, from which
+lookups by name and by attribute are built. This module requires
+numpy.
+
+>>> import os, tempfile
+>>> path = os.path.join(tempfile.mkdtemp(), 'catalog')
+>>> equal = [100.0 * i for i in range(12)]
+>>> temp = Temperament()
+>>> temp.set_frequency(Note('Eb'), 145.73388203017834)
+>>> temp.tune_fifths_up(Note('Eb'), Note('G#'))
+>>> write_catalog(path, [
+...     ('equal', equal, {'type': 'equal'}),
+...     ('pythagorean', get_scale(temp), {'type': 'regular', 'year': 1300}),
+...     ])
+>>> catalog = Catalog(path)
+>>> len(catalog)
+2
+>>> catalog.find(type='regular')
+['pythagorean']
+>>> print(np.round(catalog['pythagorean'][:4], 2))
+[  0.   113.69 203.91 294.13]
+>>> temp2 = catalog.get_temperament('pythagorean', Note('Eb'), 145.7)
+>>> print(round(temp2.get_dev_cents(Note('G#'), Note('D#')), 2))
+-23.46
+"""
+
+from __future__ import division
+
+import json
+
+import numpy as np
+
+from kbtune import CentsTemperament, Note, Temperament
+from kbtune.scala import get_scale, iter_scl
+
+
+def write_catalog(path, entries):
+    """Write a catalog from an iterable of entries, each of which is a
+    name, a scale (twelve pitches in cents relative to C), and a
+    dictionary of attributes with values that can be stored as JSON.
+    Only attributes with scalar values (strings, numbers, booleans, and
+    ``None``) can be searched for; lists and dictionaries are stored,
+    but left out of the lookup by attribute. The scales are written to
+    ``path + '.npy'`` and the index to ``path + '.json'``.
+    """
+    names = []
+    attributes = []
+    scales = []
+    for name, scale, attrs in entries:
+        names.append(name)
+        attributes.append(attrs)
+        scales.append(scale)
+    np.save(path + '.npy', np.array(scales, dtype=float).reshape(-1, 12))
+    with open(path + '.json', 'w') as index:
+        json.dump({'names': names, 'attributes': attributes}, index)
+
+
+def import_scl(path, filenames):
+    """Write a catalog from many Scala scale files, as read by
+    :func:`kbtune.scala.iter_scl`. The description of each scale is
+    stored as its ``'description'`` attribute.
+    """
+    write_catalog(path, (
+        (name, scale, {'description': description})
+        for name, description, scale in iter_scl(filenames)))
+
+
+class Catalog:
+    """A catalog of temperaments, written by :func:`write_catalog`."""
+
+    def __init__(self, path):
+        self.scales = np.load(path + '.npy', mmap_mode='r')
+        """Memory mapped array of shape ``(N, 12)`` with all scales."""
+        with open(path + '.json') as index:
+            index = json.load(index)
+        self.names = index['names']
+        """Names of all temperaments."""
+        self.attributes = index['attributes']
+        """Attributes of all temperaments."""
+        self._rows = dict((name, row) for row, name in enumerate(self.names))
+        self._values = {}
+        for row, attrs in enumerate(self.attributes):
+            for key, value in attrs.items():
+                if isinstance(value, (list, dict)):
+                    # not hashable, so not searchable
+                    continue
+                self._values.setdefault(key, {}).setdefault(
+                    value, []).append(row)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def __getitem__(self, name):
+        """Get the scale of a temperament."""
+        return self.scales[self._rows[name]]
+
+    def get_row(self, name):
+        """Get the row of a temperament in :attr:`scales`."""
+        return self._rows[name]
+
+    def get_rows(self, **attributes):
+        """Get the rows of all temperaments that have the given values
+        for the given attributes. Attributes with lists or dictionaries
+        as values never match.
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'catalog')
+        >>> write_catalog(path, [('equal', [100.0 * i for i in range(12)],
+        ...                       {'tags': ['modern'], 'type': 'equal'})])
+        >>> catalog = Catalog(path)
+        >>> catalog.get_rows(type='equal'), catalog.get_rows(tags=['modern'])
+        ([0], [])
+        >>> catalog.attributes[0]['tags']
+        ['modern']
+        """
+        rows = None
+        for key, value in attributes.items():
+            if isinstance(value, (list, dict)):
+                matches = []
+            else:
+                matches = self._values.get(key, {}).get(value, [])
+            rows = set(matches) if rows is None else rows.intersection(
+                matches)
+        if rows is None:
+            return list(range(len(self)))
+        return sorted(rows)
+
+    def find(self, **attributes):
+        """Get the names of all temperaments that have the given values
+        for the given attributes.
+        """
+        return [self.names[row] for row in self.get_rows(**attributes)]
+
+    def get_temperament(self, name, note=Note('A'), frequency=440):
+        """Create a temperament from the catalog, with *note* tuned at
+        *frequency*.
+        """
+        scale = self[name]
+        temp = CentsTemperament(frequency)
+        for position, note2 in enumerate(Temperament.NOTES):
+            temp.set_pitch(
+                note2, float(scale[position] - scale[note.position]))
+        return temp
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
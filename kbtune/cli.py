@@ -0,0 +1,266 @@
+"""
+:mod:`kbtune.cli` -- Command line interface
+===========================================
+
+Compute frequencies, deviations of fifths, or full reports, for many
+temperaments at once. Temperaments are read from Scala scale files, from
+directories of such files, or from JSON lines on standard input, each
+with a ``"name"`` and either a ``"scale"`` (as in :mod:`kbtune.scala`)
+or the deviations of the ``"fifths"`` (as in :mod:`kbtune.batch`).
+Temperaments are evaluated in a pool of worker processes, and results
+are cached on disk, by a hash of the temperament and the options, so
+evaluating an unchanged catalog again only reads the cache. The
+``serve`` command runs the tuning session server of
+:mod:`kbtune.server` instead. This module requires numpy.
+
+>>> import io, json, os, tempfile
+>>> folder = tempfile.mkdtemp()
+>>> specs = io.StringIO(json.dumps(
+...     {'name': 'equal', 'scale': [100 * i for i in range(12)]}) + '\\n')
+>>> output = io.StringIO()
+>>> main(['frequencies', '-', '--processes', '1',
+...       '--cache', os.path.join(folder, 'cache')], specs, output)
+0
+>>> print(output.getvalue())  # doctest: +ELLIPSIS
+name,C,C#,D,Eb,E,F,F#,G,G#,A,Bb,B
+equal,261.625...,277.182...,...,440.0,466.163...,493.883...
+<BLANKLINE>
+>>> len(os.listdir(os.path.join(folder, 'cache')))
+1
+"""
+
+from __future__ import division
+
+import argparse
+import concurrent.futures
+import csv
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+import kbtune
+import kbtune.server
+from kbtune import Note, Temperament
+from kbtune.batch import get_frequencies
+from kbtune.identify import get_fifth_deviations
+from kbtune.report import iter_rows
+from kbtune.scala import get_temperament, iter_scl
+
+COMMANDS = ('frequencies', 'deviations', 'report')
+"""Available commands."""
+
+CACHE_VERSION = 2
+"""Version of the results in the cache. Increase it whenever results
+change, so that older results are never read.
+"""
+
+
+def iter_specs(inputs, stdin=None):
+    """Iterate over the temperament specifications in the given inputs,
+    which are Scala scale files, directories with such files, or
+    ``'-'`` for JSON lines on *stdin*. Every specification is a
+    dictionary with a name and a scale.
+
+    >>> import io, json
+    >>> list(iter_specs(['-'], io.StringIO(json.dumps(
+    ...     {'name': 'wrong', 'fifths': [0] * 12}))))
+    Traceback (most recent call last):
+        ...
+    ValueError: Fifths of wrong must add up to minus the Pythagorean comma.
+    """
+    for path in inputs:
+        if path == '-':
+            for line in (sys.stdin if stdin is None else stdin):
+                if line.strip():
+                    spec = json.loads(line)
+                    if 'scale' not in spec:
+                        fifths = np.asarray(spec['fifths'], dtype=float)
+                        if fifths.shape != (12,):
+                            raise ValueError(
+                                "Fifths of %s must have twelve deviations."
+                                % spec['name'])
+                        if not np.isclose(np.sum(fifths),
+                                          -Temperament.PYTHAGOREAN_COMMA):
+                            raise ValueError(
+                                "Fifths of %s must add up to minus the "
+                                "Pythagorean comma." % spec['name'])
+                        freqs = get_frequencies(fifths, Note('C'), 1)
+                        spec['scale'] = [
+                            float(cents) for cents in 1200 * np.log2(freqs)]
+                    yield {'name': spec['name'], 'scale': spec['scale']}
+            continue
+        if os.path.isdir(path):
+            filenames = sorted(
+                os.path.join(path, filename) for filename in os.listdir(path)
+                if filename.lower().endswith('.scl'))
+        else:
+            filenames = [path]
+        for name, _, scale in iter_scl(filenames):
+            yield {'name': name, 'scale': scale}
+
+
+def get_key(command, spec, note, frequency):
+    """Get the key of a result in the cache, as a hash of everything the
+    result depends on.
+    """
+    content = json.dumps(
+        [CACHE_VERSION, kbtune.__version__, command, spec, str(note),
+         frequency],
+        sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def evaluate(command, spec, note, frequency):
+    """Evaluate a single temperament, and return a list of rows."""
+    temp = get_temperament(
+        spec['scale'], reference=60 + note.position, frequency=frequency)
+    if command == 'report':
+        return list(iter_rows(temp, name=spec['name']))
+    freqs = np.array(temp.frequencies, dtype=float)
+    if command == 'frequencies':
+        values = freqs
+    else:
+        values = get_fifth_deviations(freqs)
+    row = {'name': spec['name']}
+    for note2, value in zip(Temperament.NOTES, values):
+        row[str(note2)] = float(value)
+    return [row]
+
+
+def _evaluate_all(command, specs, note, frequency):
+    """Evaluate a list of temperaments, in a worker process."""
+    return [evaluate(command, spec, note, frequency) for spec in specs]
+
+
+class Cache:
+    """Results on disk, as JSON files in *folder*, by key."""
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def _get_filename(self, key):
+        return os.path.join(self.folder, key[:2], key + '.json')
+
+    def get(self, key):
+        """Get a result, or ``None`` if it is not in the cache."""
+        try:
+            with open(self._get_filename(key)) as result:
+                return json.load(result)
+        except (IOError, ValueError):
+            return None
+
+    def set(self, key, rows):
+        """Store a result."""
+        filename = self._get_filename(key)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        # write atomically, so concurrent runs never read half a result
+        temp = '%s.%i.tmp' % (filename, os.getpid())
+        with open(temp, 'w') as result:
+            json.dump(rows, result)
+        os.replace(temp, filename)
+
+
+def iter_results(command, specs, note=Note('A'), frequency=440,
+                 processes=None, cache=None, chunk_size=64):
+    """Evaluate all temperaments, and yield the rows of each, in order.
+    Results are taken from the *cache* if possible. The remaining
+    temperaments are evaluated in a pool of *processes* (by default,
+    one per cpu; use ``processes=1`` to evaluate in the current
+    process), in chunks of *chunk_size* temperaments.
+    """
+    specs = list(specs)
+    keys = [get_key(command, spec, note, frequency) for spec in specs]
+    results = [None if cache is None else cache.get(key) for key in keys]
+    todo = [i for i, result in enumerate(results) if result is None]
+    chunks = [todo[start:start + chunk_size]
+              for start in range(0, len(todo), chunk_size)]
+
+    def evaluated(chunk, chunk_results):
+        for i, rows in zip(chunk, chunk_results):
+            results[i] = rows
+            if cache is not None:
+                cache.set(keys[i], rows)
+
+    if processes == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            evaluated(chunk, _evaluate_all(
+                command, [specs[i] for i in chunk], note, frequency))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                processes or os.cpu_count()) as executor:
+            futures = [
+                executor.submit(_evaluate_all, command,
+                                [specs[i] for i in chunk], note, frequency)
+                for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                evaluated(chunk, future.result())
+    for rows in results:
+        for row in rows:
+            yield row
+
+
+def write_rows(stream, rows, output_format='csv'):
+    """Write rows to a text stream, as comma separated values with a
+    header taken from the first row, or as JSON lines.
+    """
+    if output_format == 'jsonl':
+        for row in rows:
+            stream.write(json.dumps(row))
+            stream.write('\n')
+        return
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(stream, list(row), lineterminator='\n')
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def get_parser():
+    """Get the parser of the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog='kbtune', description='Keyboard tuning calculator.',
+        epilog="Use 'kbtune serve --help' for the options of the tuning "
+        "session server.")
+    parser.add_argument('command', choices=COMMANDS)
+    parser.add_argument(
+        'inputs', nargs='+',
+        help="Scala files, directories of Scala files, or '-' to read "
+        "JSON lines from standard input")
+    parser.add_argument('--note', default='A', help="reference note")
+    parser.add_argument('--frequency', type=float, default=440,
+                        help="frequency of the reference note")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv')
+    parser.add_argument('--output', '-o', help="output file")
+    parser.add_argument('--processes', type=int,
+                        help="number of worker processes")
+    parser.add_argument('--cache', help="folder of the result cache")
+    return parser
+
+
+def main(argv=None, stdin=None, stdout=None):
+    """Run the command line interface, and return the exit status."""
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ['serve']:
+        # the server has options of its own
+        return kbtune.server.main(argv[1:], prog='kbtune serve')
+    args = get_parser().parse_args(argv)
+    rows = iter_results(
+        args.command, iter_specs(args.inputs, stdin), Note(args.note),
+        args.frequency, args.processes,
+        None if args.cache is None else Cache(args.cache))
+    if args.output is not None:
+        with open(args.output, 'w') as output:
+            write_rows(output, rows, args.format)
+    else:
+        write_rows(sys.stdout if stdout is None else stdout, rows,
+                   args.format)
+    return 0
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
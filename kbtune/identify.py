@@ -0,0 +1,166 @@
+"""
+:mod:`kbtune.identify` -- Identify temperaments
+===============================================
+
+Find the known temperaments that are closest to twelve measured
+frequencies. Temperaments are compared by the deviations in cents of
+their twelve fifths, which do not depend on the reference pitch, nor
+on the octave in which each note was measured. Every known temperament
+is indexed in all twelve transpositions, in a k-d tree, so a lookup
+only visits a small part of a large catalog. This module requires
+numpy.
+
+>>> equal = [100.0 * i for i in range(12)]
+>>> temp = Temperament()
+>>> temp.set_frequency(Note('Eb'), 145.73388203017834)
+>>> temp.tune_fifths_up(Note('Eb'), Note('G#'))
+>>> identifier = Identifier([equal, get_scale(temp)], ['equal', 'pyth'])
+>>> freqs = np.roll(temp.frequencies, 5)
+>>> freqs[0] = 2 * freqs[0] + 0.5
+>>> identifier.identify(freqs, k=1) # doctest: +ELLIPSIS
+[(3.31..., 'pyth', 5)]
+"""
+
+from __future__ import division
+
+import numpy as np
+
+from kbtune import Note, Temperament
+from kbtune.arrays import get_interval_metrics
+from kbtune.scala import get_scale
+
+
+def get_fifth_deviations(frequencies):
+    """Get the deviations in cents of the fifths going up from every
+    position, folded into the range from -600 to 600, so that they do
+    not depend on the octave of each frequency. The frequencies can
+    have any leading shape.
+
+    >>> freqs = [300 * 2 ** (i / 12) for i in range(12)]
+    >>> freqs[7] *= 2
+    >>> print(np.round(get_fifth_deviations(freqs), 2))
+    [-1.96 -1.96 -1.96 -1.96 -1.96 -1.96 -1.96 -1.96 -1.96 -1.96 -1.96 -1.96]
+    """
+    _, dev_cents, _ = get_interval_metrics(frequencies, ['P5'])
+    return (dev_cents[..., 0, :] + 600) % 1200 - 600
+
+
+class KDTree:
+    """A k-d tree over an array of points of shape ``(N, k)``, for
+    finding nearest neighbours in Euclidean distance. Cells are split
+    at the median of the coordinate with the largest spread, until at
+    most *leaf_size* points remain. Only the leaves are kept, with
+    their bounding boxes, so a query can bound the distance to all
+    leaves in one go, and then scan the leaves nearest first, until
+    no leaf can hold a nearer point.
+
+    >>> points = np.array([[0, 0], [1, 0], [0, 2], [5, 5]])
+    >>> distances, indices = KDTree(points, leaf_size=1).query([1, 1], 2)
+    >>> print(distances, indices)
+    [1.         1.41421356] [1 0]
+    """
+
+    def __init__(self, points, leaf_size=64):
+        points = np.asarray(points, dtype=float)
+        self.leaf_size = leaf_size
+        """Maximal number of points in a leaf."""
+        self._order = np.arange(len(points))
+        self._starts = []
+        self._build(points, 0, len(points))
+        self._starts.append(len(points))
+        self._starts = np.array(self._starts)
+        # store the points of each leaf contiguously
+        self.points = points[self._order]
+        """The indexed points, sorted by leaf."""
+        leaves = np.split(self.points, self._starts[1:-1])
+        self._lower = np.array([leaf.min(axis=0) for leaf in leaves])
+        self._upper = np.array([leaf.max(axis=0) for leaf in leaves])
+
+    def _build(self, points, start, stop):
+        """Split the points ``_order[start:stop]`` until they fit in
+        leaves, and record the start of each leaf.
+        """
+        order = self._order[start:stop]
+        if stop - start <= self.leaf_size:
+            self._starts.append(start)
+            return
+        cell = points[order]
+        axis = int(np.argmax(np.ptp(cell, axis=0)))
+        middle = (stop - start) // 2
+        order[:] = order[np.argpartition(cell[:, axis], middle)]
+        self._build(points, start, start + middle)
+        self._build(points, start + middle, stop)
+
+    def query(self, point, k=1, leaves=8):
+        """Get the distances to, and the indices of, the *k* points
+        nearest to *point*, nearest first. Indices refer to the rows of
+        the points as originally given. The given number of *leaves*
+        is scanned at once.
+        """
+        point = np.asarray(point, dtype=float)
+        gap = np.maximum(self._lower - point, point - self._upper)
+        np.maximum(gap, 0, out=gap)
+        bounds = np.einsum('ij,ij->i', gap, gap)
+        nearest = np.argsort(bounds)
+        best = np.full(k, np.inf)
+        best_indices = np.full(k, -1)
+        for chunk in range(0, len(nearest), leaves):
+            chunk = nearest[chunk:chunk + leaves]
+            chunk = chunk[bounds[chunk] < best[-1]]
+            if not len(chunk):
+                break
+            rows = np.concatenate([
+                np.arange(self._starts[leaf], self._starts[leaf + 1])
+                for leaf in chunk])
+            diff = self.points[rows] - point
+            dist = np.concatenate([best, np.einsum('ij,ij->i', diff, diff)])
+            rows = np.concatenate([best_indices, self._order[rows]])
+            keep = np.argsort(dist, kind='stable')[:k]
+            best, best_indices = dist[keep], rows[keep]
+        found = best_indices >= 0
+        return np.sqrt(best[found]), best_indices[found]
+
+
+class Identifier:
+    """Identify measured temperaments among known ones, given as scales
+    (pitches in cents for every position, as from
+    :func:`kbtune.scala.get_scale` or :attr:`kbtune.catalog.Catalog.scales`),
+    with the given *names*.
+    """
+
+    def __init__(self, scales, names=None, leaf_size=64):
+        scales = np.asarray(scales, dtype=float).reshape(-1, 12)
+        self.names = list(range(len(scales))) if names is None else names
+        """Names of the known temperaments."""
+        deviations = get_fifth_deviations(2 ** (scales / 1200))
+        # row r * N + i holds temperament i transposed up r semitones
+        self.tree = KDTree(
+            np.concatenate([np.roll(deviations, transposition, axis=1)
+                            for transposition in range(12)]),
+            leaf_size)
+        """The k-d tree of all transpositions of all fifth deviations."""
+
+    def identify(self, frequencies, k=2):
+        """Find the *k* known temperaments nearest to the given twelve
+        frequencies, and return a list of their distances (the
+        Euclidean norm of the difference of the fifth deviations, in
+        cents), names, and the number of semitones by which they are
+        transposed up.
+        """
+        point = get_fifth_deviations(np.asarray(frequencies, dtype=float))
+        size = len(self.names)
+        results = []
+        seen = set()
+        # every temperament can show up in several transpositions
+        for distance, index in zip(*self.tree.query(
+                point, min(12 * k, 12 * size))):
+            transposition, row = divmod(int(index), size)
+            if row not in seen:
+                seen.add(row)
+                results.append(
+                    (float(distance), self.names[row], transposition))
+        return results[:k]
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,175 @@
+"""
+:mod:`kbtune.instrument` -- Instrumentation
+===========================================
+
+Count and time calls to the tuning and metrics methods of kbtune. The
+methods are only wrapped while a :class:`Profiler` is enabled, so
+instrumentation costs nothing at all otherwise. Calls can be passed on
+to hooks, summarized, or written as a trace file that can be viewed in
+Chrome (``chrome://tracing``) or Perfetto.
+
+>>> profiler = Profiler()
+>>> with profiler:
+...     temp = Temperament()
+...     temp.set_frequency(Note('Eb'), 145.73388203017834)
+...     temp.tune_fifths_up(Note('Eb'), Note('G#'))
+>>> profiler.counts['Temperament.tune_fifth_up']
+11
+>>> profiler.counts['Temperament.set_frequency']
+12
+"""
+
+from __future__ import division
+
+import functools
+import json
+import os
+import threading
+import time
+
+from kbtune import CentsTemperament, Interval, Note, Temperament
+
+TARGETS = [
+    (Temperament, 'set_frequency'),
+    (Temperament, 'tune_fifth_up'),
+    (Temperament, 'get_cents'),
+    (Temperament, 'get_dev_cents'),
+    (Temperament, 'get_dev_bps'),
+    (CentsTemperament, 'set_pitch'),
+    (CentsTemperament, 'set_frequency'),
+    (CentsTemperament, 'tune_fifth_up'),
+    (Interval, '__new__'),
+    ]
+"""Methods that are instrumented by default, as class and name."""
+
+_ENABLED = set()
+"""Methods that are currently instrumented."""
+
+
+class Profiler:
+    """Count and time calls to the given methods (by default,
+    :data:`TARGETS`) while enabled. Each hook is called after every
+    call, with the name of the method, the start time and the duration
+    of the call (in seconds), and its arguments. If *trace* is true,
+    all calls are recorded for :meth:`write_trace`.
+    """
+
+    def __init__(self, targets=None, hooks=(), trace=False):
+        self.targets = TARGETS if targets is None else targets
+        self.hooks = list(hooks)
+        """Functions called after every call."""
+        self.trace = trace
+        self.counts = {}
+        """Number of calls, by method name."""
+        self.times = {}
+        """Total time of calls (including nested calls), in seconds, by
+        method name.
+        """
+        self.events = []
+        """Name, thread, start, and duration of all calls, if tracing."""
+        self._originals = []
+        self._origin = time.perf_counter()
+
+    def _wrap(self, name, func):
+        """Wrap a function, so its calls are counted and timed."""
+        counts = self.counts
+        times = self.times
+        counts.setdefault(name, 0)
+        times.setdefault(name, 0.0)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                counts[name] += 1
+                times[name] += duration
+                if self.trace:
+                    self.events.append(
+                        (name, threading.get_ident(), start, duration))
+                for hook in self.hooks:
+                    hook(name, start, duration, args)
+        return wrapper
+
+    def enable(self):
+        """Start instrumenting all target methods."""
+        for cls, attr in self.targets:
+            if (cls, attr) in _ENABLED:
+                raise ValueError("Method already instrumented.")
+        for cls, attr in self.targets:
+            original = cls.__dict__[attr]
+            name = '%s.%s' % (cls.__name__, attr)
+            if isinstance(original, staticmethod):
+                wrapped = staticmethod(self._wrap(name, original.__func__))
+            elif isinstance(original, classmethod):
+                wrapped = classmethod(self._wrap(name, original.__func__))
+            else:
+                wrapped = self._wrap(name, original)
+            setattr(cls, attr, wrapped)
+            _ENABLED.add((cls, attr))
+            self._originals.append((cls, attr, original))
+
+    def disable(self):
+        """Stop instrumenting, and restore all methods."""
+        while self._originals:
+            cls, attr, original = self._originals.pop()
+            setattr(cls, attr, original)
+            _ENABLED.discard((cls, attr))
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def reset(self):
+        """Discard all counts, times, and events."""
+        for name in self.counts:
+            self.counts[name] = 0
+            self.times[name] = 0.0
+        del self.events[:]
+
+    def get_summary(self):
+        """Get the name, number of calls, total time, and mean time per
+        call (in seconds) of all methods that were called, with the
+        largest total time first.
+        """
+        return sorted(
+            ((name, count, self.times[name], self.times[name] / count)
+             for name, count in self.counts.items() if count),
+            key=lambda row: -row[2])
+
+    def format_summary(self):
+        """Format the summary as a table.
+
+        >>> profiler = Profiler()
+        >>> with profiler:
+        ...     interval = Interval(Note('C'), Note('E'))
+        >>> print(profiler.format_summary()) # doctest: +ELLIPSIS
+        method                           calls   total/ms    mean/us
+        Interval.__new__                     1 ...
+        """
+        lines = ['{0: <32} {1: >5} {2: >10} {3: >10}'.format(
+            'method', 'calls', 'total/ms', 'mean/us')]
+        for name, count, total, mean in self.get_summary():
+            lines.append('{0: <32} {1: >5} {2: >10.3f} {3: >10.3f}'.format(
+                name, count, total * 1e3, mean * 1e6))
+        return '\n'.join(lines)
+
+    def write_trace(self, filename):
+        """Write all recorded calls to a file in the Chrome trace event
+        format.
+        """
+        events = [
+            {'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': thread,
+             'ts': (start - self._origin) * 1e6, 'dur': duration * 1e6}
+            for name, thread, start, duration in self.events]
+        with open(filename, 'w') as trace:
+            json.dump({'traceEvents': events}, trace)
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,207 @@
+"""
+:mod:`kbtune.keyboard` -- Full keyboards
+========================================
+
+A keyboard with a compass of many octaves, and possibly several ranks
+(such as the choirs of a harpsichord, or the stops of an organ), with
+all frequencies stored in a single numpy array. This module requires
+numpy.
+
+>>> temp = Temperament()
+>>> temp.set_frequency(Note('Eb'), 145.73388203017834)
+>>> temp.tune_fifths_up(Note('Eb'), Note('G#'))
+>>> keyboard = Keyboard()
+>>> keyboard.set_temperament(temp, octave=3)
+>>> print(round(keyboard.get_frequency(Note('A'), 4), 2))
+415.0
+>>> beats = keyboard.get_beat_rates()
+>>> beats.shape
+(1, 10, 88)
+>>> bool(np.all(np.abs(beats[0, INTERVALS.index(12)][:-12]) < 1e-9))
+True
+"""
+
+from __future__ import division
+
+import math
+
+import numpy as np
+
+from kbtune import NATURAL_INTERVALS, Interval, Note, Temperament
+
+SEMITONE_NAMES = {
+    0: 'P1', 2: 'M2', 3: 'm3', 4: 'M3', 5: 'P4', 6: 'aug4',
+    7: 'P5', 8: 'm6', 9: 'M6', 10: 'm7',
+    }
+"""Names of the natural intervals, by number of keys (modulo the
+octave).
+"""
+
+INTERVALS = (3, 4, 5, 7, 8, 9, 12, 16, 19, 24)
+"""Sizes, in keys, of the intervals evaluated by
+:meth:`Keyboard.get_beat_rates`: thirds, fourth, fifth, sixths,
+octave, tenth, twelfth, and double octave.
+"""
+
+_DISTANCES = dict(
+    (name, distance) for distance, name in Interval.NAMES.items())
+
+
+def get_harmonics(semitones):
+    """Get the harmonics of the lower and the upper note at which an
+    interval of the given number of keys, possibly spanning several
+    octaves, has its first common harmonic. Harmonics are taken from
+    :data:`kbtune.NATURAL_INTERVALS`.
+
+    >>> get_harmonics(7)
+    (3, 2)
+    >>> get_harmonics(12)
+    (2, 1)
+    >>> get_harmonics(19)
+    (3, 1)
+    >>> get_harmonics(28)
+    (5, 1)
+    >>> get_harmonics(1)
+    Traceback (most recent call last):
+        ...
+    ValueError: Not a natural interval.
+    """
+    octaves, semitones = divmod(semitones, 12)
+    try:
+        natural = NATURAL_INTERVALS[_DISTANCES[SEMITONE_NAMES[semitones]]]
+    except KeyError:
+        raise ValueError("Not a natural interval.")
+    lower = natural.lower_harmonic * 2 ** octaves
+    upper = natural.upper_harmonic
+    divisor = math.gcd(lower, upper)
+    return lower // divisor, upper // divisor
+
+
+class Keyboard:
+    """A keyboard instrument with *size* keys, starting from *lowest*
+    in *octave* (in scientific pitch notation, so the middle C starts
+    octave 4), with *ranks* ranks. By default, this is a piano.
+    Rank ``i`` sounds *offsets[i]* keys higher than written, so for
+    an organ with an 8', a 4', and a 2 2/3' stop, the offsets are
+    ``[0, 12, 19]``.
+
+    >>> keyboard = Keyboard()
+    >>> keyboard.frequencies.shape
+    (1, 88)
+    >>> print(keyboard.notes[0], keyboard.octaves[0])
+    A 0
+    >>> print(keyboard.notes[-1], keyboard.octaves[-1])
+    C 8
+    >>> keyboard.get_key(Note('A'), 4)
+    48
+    """
+
+    def __init__(self, size=88, lowest=Note('A'), octave=0, ranks=1,
+                 offsets=None):
+        pitches = octave * 12 + lowest.position + np.arange(size)
+        self.positions = pitches % 12
+        """Position of each key in the octave."""
+        self.octaves = pitches // 12
+        """Octave of each key."""
+        self.notes = [Temperament.NOTES[position]
+                      for position in self.positions]
+        """Note of each key."""
+        self.offsets = np.zeros(ranks, dtype=int) if offsets is None else (
+            np.array(offsets, dtype=int))
+        """Number of keys that each rank sounds above the written key."""
+        self.frequencies = np.full((ranks, size), np.nan)
+        """Frequencies, of shape ``(ranks, size)``, with ``nan`` for
+        untuned keys.
+        """
+        self._first_pitch = octave * 12 + lowest.position
+
+    def get_key(self, note, octave):
+        """Get the index of the key of a note in a given octave."""
+        key = octave * 12 + note.position - self._first_pitch
+        if not 0 <= key < self.frequencies.shape[1]:
+            raise ValueError("Key outside compass.")
+        return key
+
+    def get_frequency(self, note, octave, rank=0):
+        """Get the frequency of the note in the given octave."""
+        return self.frequencies[rank, self.get_key(note, octave)]
+
+    def set_frequency(self, note, octave, freq, rank=0):
+        """Tune the note in the given octave."""
+        self.frequencies[rank, self.get_key(note, octave)] = freq
+
+    def set_temperament(self, temperament, octave=4, rank=0):
+        """Tune all keys of a rank from a single octave temperament, with
+        pure octaves. The frequencies of the temperament are taken to
+        lie in the given *octave*.
+        """
+        freqs = np.array(temperament.frequencies, dtype=float)
+        self.frequencies[rank] = (
+            freqs[self.positions] * 2.0 ** (self.octaves - octave))
+
+    def tune_octaves(self, octave=4, cents=0, rank=0):
+        """Tune all keys of a rank by octaves, from the keys in the given
+        *octave*. Every octave deviates by the given *cents* (which is
+        positive for stretched octaves).
+
+        >>> keyboard = Keyboard()
+        >>> keyboard.set_frequency(Note('A'), 4, 440)
+        >>> keyboard.tune_octaves(cents=1)
+        >>> print(round(keyboard.get_frequency(Note('A'), 6), 3))
+        1762.034
+        >>> bool(np.isnan(keyboard.get_frequency(Note('G'), 6)))
+        True
+        """
+        freqs = np.full(12, np.nan)
+        keys = np.nonzero(self.octaves == octave)[0]
+        freqs[self.positions[keys]] = self.frequencies[rank, keys]
+        distance = self.octaves - octave
+        self.frequencies[rank] = (
+            freqs[self.positions] * 2.0 ** (distance * (1 + cents / 1200)))
+
+    def tune_unisons(self, source=0, cents=0, ranks=None):
+        """Tune the given ranks (by default, all other ranks) pure
+        against the *source* rank, taking into account the offsets of
+        all ranks. Each rank can deviate by *cents*, which is a single
+        value or one value per rank.
+
+        >>> keyboard = Keyboard(ranks=3, offsets=[0, 12, 19])
+        >>> keyboard.set_frequency(Note('C'), 4, 260)
+        >>> keyboard.tune_unisons()
+        >>> print(keyboard.frequencies[:, keyboard.get_key(Note('C'), 4)])
+        [260. 520. 780.]
+        """
+        if ranks is None:
+            ranks = [rank for rank in range(len(self.offsets))
+                     if rank != source]
+        cents = np.broadcast_to(np.asarray(cents, dtype=float), (len(ranks),))
+        for rank, deviation in zip(ranks, cents):
+            lower, upper = get_harmonics(
+                abs(self.offsets[rank] - self.offsets[source]))
+            ratio = lower / upper
+            if self.offsets[rank] < self.offsets[source]:
+                ratio = 1 / ratio
+            self.frequencies[rank] = (
+                self.frequencies[source] * ratio * 2 ** (deviation / 1200))
+
+    def get_beat_rates(self, intervals=INTERVALS):
+        """Get the deviation in beats per second of every interval of the
+        given sizes (in keys) that can be played on each rank, as an
+        array of shape ``(ranks, len(intervals), size)``, where entry
+        ``[rank, i, key]`` is the interval going up from *key*. Entries
+        for intervals that do not fit on the keyboard are ``nan``.
+        """
+        ranks, size = self.frequencies.shape
+        harmonics = np.array([get_harmonics(semitones)
+                              for semitones in intervals]).reshape(-1, 2)
+        padded = np.concatenate(
+            [self.frequencies, np.full((ranks, 1), np.nan)], axis=1)
+        second = np.arange(size) + np.array(intervals)[:, np.newaxis]
+        second[second >= size] = size
+        return (
+            harmonics[:, 1, np.newaxis] * padded[:, second]
+            - harmonics[:, 0, np.newaxis] * self.frequencies[:, np.newaxis])
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,178 @@
+"""
+:mod:`kbtune.keys` -- Key colour
+================================
+
+Evaluate the intervals of all 24 major and minor triads in one go, for
+a single temperament, or for a whole batch of them. In a well
+temperament, the thirds, fifths, and sixths of each triad deviate by
+different amounts, which gives each key its own colour. This module
+requires numpy.
+
+>>> temp = Temperament()
+>>> temp.set_frequency(Note('Eb'), 145.73388203017834)
+>>> temp.tune_fifths_up(Note('Eb'), Note('G#'))
+>>> dev_cents, dev_bpm = get_triad_metrics(temp.frequencies)
+>>> dev_cents.shape
+(24, 6)
+>>> print(TRIADS[0], np.round(dev_cents[0], 2) + 0)
+C [ 21.51 -21.51   0.   -21.51  21.51   0.  ]
+>>> print(TRIADS[8], np.round(dev_cents[8], 2) + 0)
+G# [ -1.95 -21.51 -23.46   1.95  21.51  23.46]
+"""
+
+from __future__ import division
+
+import numpy as np
+
+from kbtune import Note, Temperament
+from kbtune.arrays import get_interval_metrics
+
+TRIAD_INTERVALS = (
+    'third', 'upper_third', 'fifth', 'sixth', 'upper_sixth', 'fourth')
+"""Names of the intervals of each triad: the lower and the upper third,
+the fifth, the sixth and the fourth of the inversions (going up from
+the third and the fifth), and the sixth going up from the fifth.
+"""
+
+TRIADS = tuple(
+    [str(note) for note in Temperament.NOTES]
+    + [str(note).lower() for note in Temperament.NOTES])
+"""Names of the triads: all twelve major triads, by root position,
+followed by all twelve minor triads.
+"""
+
+MODES = ('major', 'minor')
+"""Modes of the triads, in order of :data:`TRIADS`."""
+
+STATISTICS = ('mean', 'min', 'max', 'spread')
+"""Statistics over all keys of each mode, calculated by
+:func:`get_key_statistics`.
+"""
+
+_INTERVALS = ('M3', 'm3', 'P5', 'm6', 'M6', 'P4')
+
+# interval and semitones above the root of the lower note, by mode
+_TRIAD_TABLE = {
+    'major': (('M3', 0), ('m3', 4), ('P5', 0), ('m6', 4), ('M6', 7),
+              ('P4', 7)),
+    'minor': (('m3', 0), ('M3', 3), ('P5', 0), ('M6', 3), ('m6', 7),
+              ('P4', 7)),
+    }
+
+
+def _get_indices():
+    """Get, for every triad and each of its intervals, the row and the
+    column in the result of :func:`get_interval_metrics` for
+    ``_INTERVALS``.
+    """
+    rows = np.empty((24, 6), dtype=int)
+    columns = np.empty((24, 6), dtype=int)
+    for mode_index, mode in enumerate(MODES):
+        for i, (name, offset) in enumerate(_TRIAD_TABLE[mode]):
+            roots = np.arange(12)
+            rows[roots + 12 * mode_index, i] = _INTERVALS.index(name)
+            columns[roots + 12 * mode_index, i] = (roots + offset) % 12
+    return rows, columns
+
+_ROWS, _COLUMNS = _get_indices()
+
+
+def get_triad_metrics(frequencies):
+    """Get the deviation in cents, and in beats per minute, of all
+    :data:`TRIAD_INTERVALS` of all :data:`TRIADS`. The frequencies can
+    have any leading shape, and the results have shape
+    ``frequencies.shape[:-1] + (24, 6)``.
+
+    >>> freqs = [300 * 2 ** (i / 12) for i in range(12)]
+    >>> dev_cents, dev_bpm = get_triad_metrics(freqs)
+    >>> print(np.round(dev_cents[0], 2))
+    [ 13.69 -15.64  -1.96 -13.69  15.64   1.96]
+    >>> print(np.round(dev_cents[12], 2))
+    [-15.64  13.69  -1.96  15.64 -13.69   1.96]
+    """
+    _, dev_cents, dev_bps = get_interval_metrics(
+        np.asarray(frequencies, dtype=float), _INTERVALS)
+    return (dev_cents[..., _ROWS, _COLUMNS],
+            60 * dev_bps[..., _ROWS, _COLUMNS])
+
+
+def get_key_colours(frequencies):
+    """Get the colour of every key, as the mean absolute deviation in
+    cents, and in beats per minute, of the third, the upper third,
+    and the fifth of its triad. The results have shape
+    ``frequencies.shape[:-1] + (24,)``.
+
+    >>> freqs = [300 * 2 ** (i / 12) for i in range(12)]
+    >>> cents, bpm = get_key_colours(freqs)
+    >>> print(round(cents[0], 2), round(cents[12], 2))
+    10.43 10.43
+    """
+    dev_cents, dev_bpm = get_triad_metrics(frequencies)
+    return (np.mean(np.abs(dev_cents[..., :3]), axis=-1),
+            np.mean(np.abs(dev_bpm[..., :3]), axis=-1))
+
+
+def _get_dtype():
+    """Get the fields of the statistics of the key colours."""
+    return [('%s_%s_%s' % (mode, stat, unit), float)
+            for mode in MODES for stat in STATISTICS
+            for unit in ('cents', 'bpm')]
+
+
+def _set_statistics(result, cents, bpm):
+    """Store the statistics of the key colours in a structured array."""
+    for mode_index, mode in enumerate(MODES):
+        for unit, colours in (('cents', cents), ('bpm', bpm)):
+            colours = colours[..., 12 * mode_index:12 * (mode_index + 1)]
+            low = np.min(colours, axis=-1)
+            high = np.max(colours, axis=-1)
+            values = {
+                'mean': np.mean(colours, axis=-1),
+                'min': low,
+                'max': high,
+                'spread': high - low,
+                }
+            for stat in STATISTICS:
+                result['%s_%s_%s' % (mode, stat, unit)] = values[stat]
+
+
+def get_key_statistics(frequencies):
+    """Get the :data:`STATISTICS` of the key colours over all keys of
+    each mode, as a structured array of shape
+    ``frequencies.shape[:-1]``, with fields such as
+    ``'major_spread_cents'``. A large spread means that keys differ
+    much in colour.
+
+    >>> freqs = [300 * 2 ** (i / 12) for i in range(12)]
+    >>> stats = get_key_statistics(freqs)
+    >>> print(round(float(stats['major_spread_cents']), 6))
+    0.0
+    """
+    cents, bpm = get_key_colours(frequencies)
+    result = np.empty(cents.shape[:-1], dtype=_get_dtype())
+    _set_statistics(result, cents, bpm)
+    return result
+
+
+def get_batch_statistics(batch):
+    """Get the statistics of the key colours, as by
+    :func:`get_key_statistics`, of all temperaments of a
+    :class:`kbtune.batch.TemperamentBatch`, chunk by chunk.
+
+    >>> from kbtune.batch import TemperamentBatch
+    >>> deviations = np.zeros((2, 12))
+    >>> deviations[0] = -Temperament.PYTHAGOREAN_COMMA / 12
+    >>> deviations[1, Note('G#').position] = -Temperament.PYTHAGOREAN_COMMA
+    >>> stats = get_batch_statistics(TemperamentBatch(deviations))
+    >>> print(np.round(stats['major_spread_cents'], 2))
+    [ 0.   14.34]
+    """
+    result = np.empty(len(batch), dtype=_get_dtype())
+    for start, stop in batch.iter_chunks():
+        cents, bpm = get_key_colours(batch.get_frequencies(start, stop))
+        _set_statistics(result[start:stop], cents, bpm)
+    return result
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
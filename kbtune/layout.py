@@ -0,0 +1,323 @@
+"""
+:mod:`kbtune.layout` -- Keyboard layouts
+========================================
+
+Keyboards with any number of keys to the octave, such as keyboards with
+split sharps, or with 19 or 31 keys to the octave. A layout spells
+every key with a note, and maps every other note to the key of its
+nearest enharmonic, on the line of fifths. Keys and octave offsets of
+all interned notes, and the number of keys between any two of them,
+are precomputed in tables, so a temperament on a large layout is just
+as fast as one on the usual twelve keys.
+
+>>> layout = get_division(19)
+>>> ' '.join(str(note) for note in layout.notes)
+'C C# Db D D# Eb E E# F F# Gb G G# Ab A A# Bb B Cb'
+>>> layout.get_key(Note('G#')), layout.get_key(Note('Ab'))
+(12, 13)
+>>> temp = LayoutTemperament(layout)
+>>> temp.set_frequency(Note('Cb'), 254)
+>>> temp.tune_fifths_up(Note('Cb'), Note('E#'), 1200 * 11 / 19 - 701.955)
+>>> round(temp.get_dev_cents(Note('C'), Note('E')), 2)
+-7.37
+>>> round(temp.get_cents(Note('G#'), Note('Ab')), 2)
+63.16
+"""
+
+from __future__ import division
+
+from kbtune import (Interval, Note, Temperament, cents_to_ratio,
+                    ratio_to_cents)
+
+LINE_OF_FIFTHS = {0: 0, 1: 2, 2: 4, 3: -1, 4: 1, 5: 3, 6: 5}
+"""Position of every natural key on the line of fifths, counted in
+fifths from C. A sharp moves a note seven fifths up the line.
+"""
+
+
+def get_step(note, size=12, fifth=7):
+    """Get the step on which a note falls, in an equal division of the
+    octave into *size* steps with a fifth of *fifth* steps, counted
+    from the C of the octave of the note.
+
+    >>> get_step(Note('B#')), get_step(Note('B#'), 31, 18)
+    (12, 30)
+    """
+    natural = LINE_OF_FIFTHS[note.key] * fifth % size
+    return natural + (7 * fifth - 4 * size) * note.accidental
+
+
+def get_line_index(note):
+    """Get the position of a note on the line of fifths.
+
+    >>> get_line_index(Note('Eb')), get_line_index(Note('G#'))
+    (-3, 8)
+    """
+    return LINE_OF_FIFTHS[note.key] + 7 * note.accidental
+
+
+class Layout:
+    """A keyboard layout with one key for each of the given *notes*,
+    in order of pitch, starting at the bottom of the octave. The
+    layout lies in a division of the octave into *division* equal steps,
+    with a fifth of *fifth* steps, which decides the enharmonics: a
+    note that does not have a key of its own is played on the key of
+    the nearest note on the line of fifths, among the notes that fall
+    on the same step of the division. Several keys can share a step,
+    for split keys.
+
+    >>> layout = Layout(['C', 'C#', 'D', 'D#', 'Eb', 'E', 'F', 'F#',
+    ...                  'G', 'G#', 'Ab', 'A', 'Bb', 'B'])
+    >>> layout.size
+    14
+    >>> layout.get_key(Note('Db')), layout.get_key(Note('B#'))
+    (1, 0)
+    >>> layout.get_octave_offset(Note('B#'))
+    1
+    >>> layout.get_steps(Note('G#'), Note('B#'))
+    5
+    """
+
+    def __init__(self, notes, division=12, fifth=7):
+        self.notes = [Note(note) if isinstance(note, str) else note
+                      for note in notes]
+        """Note of each key."""
+        self.size = len(self.notes)
+        """Number of keys in an octave."""
+        self.division = division
+        """Number of equal steps in the octave of the division."""
+        self.fifth = fifth
+        """Number of steps of a fifth in the division."""
+        if len(set(self.notes)) != self.size:
+            raise ValueError("Notes must be different.")
+        self._keys = []
+        """Key of each interned note, by index."""
+        self._octave_offsets = []
+        """Octave offset of each interned note, by index."""
+        for note in Note._NOTES:
+            key, octave_offset = self._find(note)
+            self._keys.append(key)
+            self._octave_offsets.append(octave_offset)
+        self._steps = [
+            [key2 - key1 + self.size * (octave_offset2 - octave_offset1)
+             for key2, octave_offset2 in zip(self._keys, self._octave_offsets)]
+            for key1, octave_offset1 in zip(self._keys, self._octave_offsets)]
+        """Number of keys between any two interned notes, by the indices
+        of both notes.
+        """
+        self._fifth_ratios = [
+            self._get_fifth_ratio(note) for note in Note._NOTES]
+        """Ratio of the frequencies of the keys of the fifth going up
+        from each interned note, by index.
+        """
+        self.chain = sorted(self.notes, key=get_line_index)
+        """Notes of all keys, in the order of the line of fifths."""
+
+    def _find(self, note):
+        """Find the key of a note, and its octave offset."""
+        step = get_step(note, self.division, self.fifth)
+        line_index = get_line_index(note)
+        best = None
+        for key, note2 in enumerate(self.notes):
+            step2 = get_step(note2, self.division, self.fifth) % self.division
+            if (step - step2) % self.division:
+                continue
+            distance = abs(get_line_index(note2) - line_index)
+            if best is None or distance < best[0]:
+                best = (distance, key, (step - step2) // self.division)
+        if best is None:
+            raise ValueError("Layout has no key for %s." % note)
+        return best[1], best[2]
+
+    def _get_fifth_ratio(self, note):
+        """Calculate the ratio of the frequencies of the keys of the
+        natural fifth going up from a note.
+        """
+        next_note = note + Temperament.PERFECT_FIFTH
+        octaves = (self.get_octave_offset(note)
+                   - self.get_octave_offset(next_note))
+        if not next_note > note:
+            # the fifth lies in the next octave
+            octaves -= 1
+        return 3 / 2 * 2 ** octaves
+
+    def get_key(self, note):
+        """Get the key (a number between 0 and ``size - 1``) on which a
+        note is played.
+        """
+        if note.index is not None:
+            return self._keys[note.index]
+        return self._find(note)[0]
+
+    def get_octave_offset(self, note):
+        """Get the number of octaves that a note lies above its key in
+        the octave of the layout.
+        """
+        if note.index is not None:
+            return self._octave_offsets[note.index]
+        return self._find(note)[1]
+
+    def get_fifth_ratio(self, note):
+        """Get the ratio of the frequencies of the keys of the natural
+        fifth going up from a note.
+
+        >>> layout = get_division(12)
+        >>> layout.get_fifth_ratio(Note('C')), layout.get_fifth_ratio(Note('G'))
+        (1.5, 0.75)
+        """
+        if note.index is not None:
+            return self._fifth_ratios[note.index]
+        return self._get_fifth_ratio(note)
+
+    def get_steps(self, note1, note2):
+        """Get the (signed) number of keys from one note to another.
+
+        >>> get_division(31).get_steps(Note('C'), Note('E'))
+        10
+        """
+        if note1.index is not None and note2.index is not None:
+            return self._steps[note1.index][note2.index]
+        key1, octave_offset1 = self._find(note1)
+        key2, octave_offset2 = self._find(note2)
+        return key2 - key1 + self.size * (octave_offset2 - octave_offset1)
+
+
+def get_division(size, fifth=None):
+    """Get the layout of an equal division of the octave into *size*
+    keys, with a fifth of *fifth* keys (by default, the best
+    approximation of a natural fifth). Every key is spelled with the
+    note closest to D on the line of fifths, preferring sharps.
+
+    >>> [str(note) for note in get_division(12).notes] == [
+    ...     str(note) for note in Temperament.NOTES]
+    True
+    >>> get_division(31).size
+    31
+    >>> get_division(24)
+    Traceback (most recent call last):
+        ...
+    ValueError: Fifth must reach every key.
+    """
+    if fifth is None:
+        fifth = int(round(size * Temperament.PERFECT_FIFTH.get_cents() / 1200))
+    spellings = {}
+    for note in Note._NOTES:
+        step = get_step(note, size, fifth) % size
+        rank = (abs(get_line_index(note) - 2), -get_line_index(note))
+        if step not in spellings or rank < spellings[step][0]:
+            spellings[step] = (rank, note)
+    if len(spellings) != size:
+        raise ValueError("Fifth must reach every key.")
+    return Layout([spellings[step][1] for step in range(size)], size, fifth)
+
+STANDARD = get_division(12)
+"""The usual layout of twelve keys to the octave."""
+
+
+class LayoutTemperament(Temperament):
+    """A temperament on a keyboard with the given layout (by default,
+    the usual twelve keys). Frequencies are stored by key, rather than
+    by position.
+
+    >>> temp = LayoutTemperament()
+    >>> temp.set_frequency(Note('Eb'), 145.73388203017834)
+    >>> temp.tune_fifths_up(Note('Eb'), Note('G#'))
+    >>> print(round(2 * temp.get_frequency(Note('A')), 6))
+    415.0
+    >>> round(temp.get_dev_bpm(Note('G#'), Note('D#')), 2)
+    -477.19
+    """
+
+    def __init__(self, layout=None):
+        self.layout = STANDARD if layout is None else layout
+        """Layout of the keyboard."""
+        self.frequencies = [None] * self.layout.size
+        """List of frequencies for each key."""
+        self.clear_cache()
+
+    def clear_cache(self):
+        Temperament.clear_cache(self)
+        self._dependents = [set() for key in range(self.layout.size)]
+
+    def _get_cached(self, cache, calc, note1, note2):
+        if note1.index is None or note2.index is None:
+            return calc(note1, note2)
+        key = (note1.index, note2.index)
+        try:
+            return cache[key]
+        except KeyError:
+            value = cache[key] = calc(note1, note2)
+            keys = self.layout._keys
+            self._dependents[keys[note1.index]].add(key)
+            self._dependents[keys[note2.index]].add(key)
+            return value
+
+    def set_frequency(self, note, freq):
+        if note.index is not None:
+            key = self.layout._keys[note.index]
+        else:
+            key = self.layout.get_key(note)
+        self.frequencies[key] = freq
+        self._invalidate(key)
+
+    def get_frequency(self, note):
+        if note.index is not None:
+            return self.frequencies[self.layout._keys[note.index]]
+        return self.frequencies[self.layout.get_key(note)]
+
+    def _calc_cents(self, note1, note2):
+        return ratio_to_cents(
+            self.get_frequency(note2)
+            / self.get_frequency(note1)) + 1200 * (
+                self.layout.get_octave_offset(note2)
+                - self.layout.get_octave_offset(note1))
+
+    def _calc_dev_bps(self, note1, note2):
+        interval = Interval(note1, note2)
+        if not interval.up:
+            return -self.get_dev_bps(note2, note1)
+        natural = interval.get_natural()
+        return (natural.upper_harmonic * self.get_frequency(note2)
+                * 2 ** self.layout.get_octave_offset(note2)
+                - natural.lower_harmonic * self.get_frequency(note1)
+                * 2 ** self.layout.get_octave_offset(note1))
+
+    def iter_rows(self, interval=None):
+        """Iterate over the intervals going up from every key, in the
+        order of the line of fifths, as :meth:`Temperament.iter_rows`.
+        """
+        if interval is None:
+            interval = self.PERFECT_FIFTH
+        for note in self.layout.chain:
+            next_note = note + interval
+            if (self.is_tuned(self.layout.get_key(note))
+                    and self.is_tuned(self.layout.get_key(next_note))):
+                yield self._get_row(note, next_note, interval)
+            else:
+                yield {'note1': note, 'note2': next_note,
+                       'cents': None, 'dev_cents': None,
+                       'dev_bps': None, 'dev_bpm': None}
+
+    def _get_octave_frequency(self, note):
+        return (self.get_frequency(note)
+                * 2 ** self.layout.get_octave_offset(note))
+
+    def tune_fifth_up(self, note, cents=0):
+        """Tune a fifth, and return the tuned note.
+
+        >>> temp = LayoutTemperament(get_division(31))
+        >>> temp.set_frequency(Note('E#'), 300)
+        >>> print(temp.tune_fifth_up(Note('E#')))
+        B#
+        >>> temp.get_frequency(Note('B#'))
+        450.0
+        """
+        next_note = note + self.PERFECT_FIFTH
+        self.set_frequency(next_note, cents_to_ratio(cents)
+                           * self.get_frequency(note)
+                           * self.layout.get_fifth_ratio(note))
+        return next_note
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
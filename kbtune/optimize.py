@@ -0,0 +1,175 @@
+"""
+:mod:`kbtune.optimize` -- Optimal temperaments
+==============================================
+
+Find the temperament whose interval deviations are, in the weighted
+least squares sense, closest to given targets. Deviations in cents are
+linear in the pitches (in cents), and deviations in beats are linear
+in the frequencies, so in either case the optimal temperament solves a
+small linear system. This module requires numpy.
+
+>>> temp = optimal_temperament({'P5': 1})
+>>> print(np.round(temp.get_metrics()[1][0], 2))
+[-1.96 -1.96 -1.96 -1.96 -1.96 -1.96 -1.96 -1.96 -1.96 -1.96 -1.96 -1.96]
+>>> print(temp.get_frequency(Note('A')))
+415.0
+>>> equal = 415 * 2 ** ((np.arange(12) - 9) / 12)
+>>> bool(np.allclose(temp.frequencies, equal))
+True
+"""
+
+from __future__ import division
+
+import numpy as np
+
+from kbtune import Note
+from kbtune.arrays import ArrayTemperament, get_interval_table
+
+UNITS = {'cents': 1, 'bps': 1, 'bpm': 60}
+"""Units in which deviations can be optimized, and their scale
+relative to cents or beats per second.
+"""
+
+
+def _as_rows(values, names, default):
+    """Convert a dictionary mapping interval names to a scalar or to
+    twelve values into an array with one row per name.
+    """
+    return np.array([
+        np.broadcast_to(
+            np.asarray(values.get(name, default), dtype=float), (12,))
+        for name in names])
+
+
+def optimal_temperament(weights, targets=None, constraints=None,
+                        unit='cents', note=Note('A'), frequency=415):
+    """Calculate the temperament that minimizes the weighted sum of
+    squared differences between interval deviations and their
+    targets, subject to constraints, with *note* tuned at *frequency*.
+
+    Weights, targets, and constraints are dictionaries mapping interval
+    names (see :attr:`Interval.NAMES`) to either a single value, or an
+    array of twelve values, one for the interval going up from each
+    note in :attr:`Temperament.NOTES`. Targets default to zero.
+    Constraints equal to ``nan`` are ignored. Deviations are measured
+    in the given *unit*, which is ``'cents'``, ``'bps'``, or ``'bpm'``.
+    The weighted intervals and the constraints together must determine
+    all twelve notes.
+
+    Weighing only major thirds does not decide how the four cycles of
+    major thirds lie relative to each other, so this is an error:
+
+    >>> optimal_temperament({'M3': 1})
+    Traceback (most recent call last):
+        ...
+    ValueError: Weights and constraints do not determine the temperament.
+
+    Weighing the fifths a little as well makes all thirds equal, in
+    equal temperament:
+
+    >>> temp = optimal_temperament({'M3': 1, 'P5': 0.01})
+    >>> print(np.round(temp.get_metrics()[1][1], 2))
+    [13.69 13.69 13.69 13.69 13.69 13.69 13.69 13.69 13.69 13.69 13.69 13.69]
+    >>> equal = 415 * 2 ** ((np.arange(12) - 9) / 12)
+    >>> bool(np.allclose(temp.frequencies, equal))
+    True
+
+    Constraining all fifths but one to be pure gives Pythagorean tuning:
+
+    >>> pure = np.zeros(12)
+    >>> pure[Note('G#').position] = np.nan
+    >>> temp = optimal_temperament({}, constraints={'P5': pure})
+    >>> print(temp)
+               INT/c      DEV/c    DEV/bpm
+              % 1200                      
+    --------------------------------------
+    A -E      701.96       0.00       0.00
+    E -B      701.96       0.00       0.00
+    B -F#     701.96       0.00       0.00
+    F#-C#     701.96       0.00       0.00
+    C#-G#     701.96       0.00       0.00
+    G#-D#     678.49     -23.46    -954.38
+    Eb-Bb     701.96       0.00       0.00
+    Bb-F      701.96       0.00       0.00
+    F -C      701.96       0.00       0.00
+    C -G      701.96       0.00       0.00
+    G -D      701.96       0.00       0.00
+    D -A      701.96       0.00       0.00
+    <BLANKLINE>
+
+    Fifths and thirds in beats, with the thirds counting double, beat
+    less than in equal temperament:
+
+    >>> temp = optimal_temperament({'P5': 1, 'M3': 2}, unit='bpm')
+    >>> equal = ArrayTemperament(415 * 2 ** ((np.arange(12) - 9) / 12))
+    >>> def error(temp):
+    ...     beats = temp.get_metrics()[2][:2] * 60
+    ...     return np.sum(np.array([[1], [2]]) * beats ** 2)
+    >>> bool(error(temp) < error(equal))
+    True
+
+    Contradicting constraints are an error:
+
+    >>> optimal_temperament({}, constraints={'P5': 0})
+    Traceback (most recent call last):
+        ...
+    ValueError: Inconsistent constraints.
+    """
+    if unit not in UNITS:
+        raise ValueError("Unknown unit '%s'." % unit)
+    targets = targets or {}
+    constraints = constraints or {}
+    names = sorted(set(weights) | set(targets) | set(constraints))
+    semitones, natural_cents, lower_harmonics, upper_harmonics = (
+        get_interval_table(names))
+    # coefficients of both notes of every interval, one row per interval
+    first = np.tile(np.arange(12), len(names))
+    second = np.arange(12) + semitones[:, np.newaxis]
+    octaves = (second // 12).ravel()
+    second = (second % 12).ravel()
+    rows = np.arange(first.size)
+    matrix = np.zeros((first.size, 12))
+    if unit == 'cents':
+        matrix[rows, first] -= 1
+        matrix[rows, second] += 1
+        offset = 1200 * octaves - np.repeat(natural_cents, 12)
+        reference = 0
+    else:
+        matrix[rows, first] -= np.repeat(lower_harmonics, 12)
+        matrix[rows, second] += (
+            np.repeat(upper_harmonics, 12) * 2.0 ** octaves)
+        matrix *= UNITS[unit]
+        offset = np.zeros(first.size)
+        reference = frequency
+    # deviations are matrix.dot(x) + offset
+    weight = _as_rows(weights, names, 0).ravel()
+    target = _as_rows(targets, names, 0).ravel() - offset
+    constraint = _as_rows(constraints, names, np.nan).ravel()
+    fixed = ~np.isnan(constraint)
+    lhs = np.vstack([matrix[fixed], np.eye(12)[[note.position]]])
+    rhs = np.concatenate([constraint[fixed] - offset[fixed], [reference]])
+    # without a unique solution, lstsq would silently pick the one with
+    # the smallest norm
+    if np.linalg.matrix_rank(
+            np.vstack([matrix[weight > 0], lhs])) < 12:
+        raise ValueError(
+            "Weights and constraints do not determine the temperament.")
+    # solve the KKT system of the constrained least squares problem
+    size = 12 + len(rhs)
+    kkt = np.zeros((size, size))
+    kkt[:12, :12] = matrix.T.dot(weight[:, np.newaxis] * matrix)
+    kkt[:12, 12:] = lhs.T
+    kkt[12:, :12] = lhs
+    solution = np.linalg.lstsq(
+        kkt, np.concatenate([matrix.T.dot(weight * target), rhs]),
+        rcond=None)[0][:12]
+    if not np.allclose(lhs.dot(solution), rhs, atol=1e-6):
+        raise ValueError("Inconsistent constraints.")
+    solution[note.position] = reference
+    if unit == 'cents':
+        solution = frequency * 2 ** (solution / 1200)
+    return ArrayTemperament(solution)
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,123 @@
+"""
+:mod:`kbtune.piano` -- Inharmonic strings
+=========================================
+
+Real strings are stiff, so their partials are not exact multiples of
+the fundamental. The n-th partial of a string with fundamental
+frequency f and inharmonicity coefficient B lies at
+n * f * sqrt(1 + B * n ** 2). This stretches the octaves of a piano,
+and shifts the partials at which intervals beat. This module requires
+numpy.
+
+>>> piano = Piano(inharmonicity=4e-4)
+>>> piano.set_frequency(Note('A'), 4, 440)
+>>> piano.tune_octaves()
+>>> beats = piano.get_beat_rates([12])
+>>> print(round(beats[0, 0, piano.get_key(Note('A'), 4)], 2))
+-0.53
+>>> piano.stretch_octaves()
+>>> beats = piano.get_beat_rates([12])
+>>> print(round(beats[0, 0, piano.get_key(Note('A'), 4)], 2) + 0)
+0.0
+"""
+
+from __future__ import division
+
+import numpy as np
+
+from kbtune import Note
+from kbtune.keyboard import INTERVALS, Keyboard, get_harmonics
+
+
+def get_partials(frequencies, harmonics, inharmonicity):
+    """Get the frequencies of the given partials of strings with the
+    given fundamental frequencies and inharmonicity coefficients. All
+    arguments are broadcast against each other.
+
+    >>> print(get_partials(100, np.arange(1, 5), 0))
+    [100. 200. 300. 400.]
+    >>> print(np.round(get_partials(100, np.arange(1, 5), 1e-3), 2))
+    [100.05 200.4  301.35 403.19]
+    """
+    harmonics = np.asarray(harmonics)
+    return (harmonics * np.asarray(frequencies)
+            * np.sqrt(1 + np.asarray(inharmonicity) * harmonics ** 2))
+
+
+class Piano(Keyboard):
+    """A keyboard with an inharmonicity coefficient for every key,
+    given as a single value or as an array with one value per key.
+    All ranks share the same coefficients.
+    """
+
+    def __init__(self, size=88, lowest=Note('A'), octave=0, ranks=1,
+                 offsets=None, inharmonicity=0):
+        Keyboard.__init__(self, size, lowest, octave, ranks, offsets)
+        self.inharmonicity = np.array(
+            np.broadcast_to(np.asarray(inharmonicity, dtype=float), (size,)))
+        """Inharmonicity coefficient of the string of each key."""
+
+    def get_beat_rates(self, intervals=INTERVALS):
+        """Get the beat rates, in beats per second, between the
+        coinciding partials of every interval of the given sizes (in
+        keys), as an array of shape ``(ranks, len(intervals), size)``.
+        The partials are those of the first common harmonic of the
+        natural interval. Entries for intervals that do not fit on the
+        keyboard are ``nan``.
+        """
+        ranks, size = self.frequencies.shape
+        harmonics = np.array([get_harmonics(semitones)
+                              for semitones in intervals]).reshape(-1, 2)
+        freqs = np.concatenate(
+            [self.frequencies, np.full((ranks, 1), np.nan)], axis=1)
+        coefs = np.append(self.inharmonicity, np.nan)
+        second = np.arange(size) + np.array(intervals)[:, np.newaxis]
+        second[second >= size] = size
+        upper = get_partials(
+            freqs[:, second], harmonics[:, 1, np.newaxis], coefs[second])
+        lower = get_partials(
+            self.frequencies[:, np.newaxis], harmonics[:, 0, np.newaxis],
+            self.inharmonicity)
+        return upper - lower
+
+    def stretch_octaves(self, octave=4, partials=(2, 1), rank=0):
+        """Tune all keys of a rank by octaves from the keys in the given
+        *octave*, so that in every octave the given partials of the
+        lower and the upper note coincide. For example, ``(2, 1)``
+        gives beatless 2:1 octaves, and ``(4, 2)`` beatless 4:2
+        octaves.
+
+        >>> piano = Piano(inharmonicity=np.geomspace(1e-4, 1e-2, 88))
+        >>> piano.set_frequency(Note('A'), 4, 440)
+        >>> piano.stretch_octaves(partials=(4, 2))
+        >>> key = piano.get_key(Note('A'), 7)
+        >>> print(round(1200 * np.log2(piano.frequencies[0, key] / 3520), 2))
+        57.58
+        """
+        lower_harmonic, upper_harmonic = partials
+        ranks, size = self.frequencies.shape
+        # arrange keys (with padding) as a grid of octaves by positions
+        start = self._first_pitch - self._first_pitch % 12
+        octaves = -(-(self._first_pitch + size - start) // 12)
+        keys = start + np.arange(octaves * 12) - self._first_pitch
+        valid = (keys >= 0) & (keys < size)
+        keys = np.where(valid, keys, 0)
+        coefs = np.where(valid, self.inharmonicity[keys], 0)
+        freqs = np.where(valid, self.frequencies[rank, keys], np.nan)
+        coefs = coefs.reshape(octaves, 12)
+        freqs = freqs.reshape(octaves, 12)
+        # log2 of the ratio between each key and the key an octave up
+        stretch = np.log2(
+            lower_harmonic / upper_harmonic
+            * np.sqrt((1 + coefs[:-1] * lower_harmonic ** 2)
+                      / (1 + coefs[1:] * upper_harmonic ** 2)))
+        total = np.zeros((octaves, 12))
+        total[1:] = np.cumsum(stretch, axis=0)
+        reference = octave - start // 12
+        result = (np.log2(freqs[reference]) - total[reference]) + total
+        self.frequencies[rank] = 2 ** result.ravel()[
+            np.arange(size) + self._first_pitch - start]
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,264 @@
+"""
+:mod:`kbtune.plan` -- Bearing plans
+===================================
+
+Plan the order in which to tune the notes of a temperament, starting
+from a single reference note. Every step tunes one note from a note
+that is already tuned, by a fifth, fourth, third, or sixth, at a
+target beat rate, and lists the thirds and sixths with notes tuned
+earlier that can be used to check the step. Plans are searched over
+all sets of tuned notes, with the best remainder of the plan for each
+set memoized, so plans are cheap to generate, and are yielded one step
+at a time. This module requires numpy.
+
+>>> temp = Temperament()
+>>> temp.set_frequency(Note('Eb'), 145.73388203017834)
+>>> temp.tune_fifths_up(Note('Eb'), Note('G#'))
+>>> planner = Planner(temp)
+>>> steps = planner.iter_steps(Note('A'))
+>>> print(next(steps))
+tune D from A (P5 down) at 0.00 bpm
+>>> print(next(steps))
+tune G from D (P4 up) at 0.00 bpm
+>>> print(next(steps))
+tune C from G (P5 down) at 0.00 bpm, check A-C (M6 down) at 461.11 bpm
+>>> len(list(steps))
+8
+"""
+
+from __future__ import division
+
+import math
+
+import numpy as np
+
+from kbtune import Note, Temperament
+from kbtune.keyboard import SEMITONE_NAMES, get_harmonics
+
+CHECK_INTERVALS = (3, 4, 8, 9)
+"""Sizes, in semitones, of the intervals by which steps are checked."""
+
+INTERVAL_COSTS = {3: 0.5, 4: 0.5, 5: 0, 7: 0, 8: 1, 9: 1}
+"""Cost of tuning by each interval, by size in semitones, on top of the
+cost of a step. Notes are only tuned by these intervals.
+"""
+
+
+def get_beat_rate(freq1, freq2):
+    """Get the number of semitones, and the beat rate in beats per
+    minute, of the interval between two frequencies. The beat rate is
+    positive if the interval is wide.
+
+    >>> semitones, bpm = get_beat_rate(440, 330)
+    >>> semitones, round(bpm, 6)
+    (-5, 0.0)
+    """
+    cents = 1200 * math.log2(freq2 / freq1)
+    semitones = int(round(cents / 100))
+    lower, upper = (freq1, freq2) if semitones >= 0 else (freq2, freq1)
+    try:
+        lower_harmonic, upper_harmonic = get_harmonics(abs(semitones))
+    except ValueError:
+        return semitones, float('nan')
+    return semitones, 60.0 * (upper_harmonic * upper - lower_harmonic * lower)
+
+
+class Step:
+    """Tune *note* from *reference* by an interval of *semitones*
+    (negative when going down), so that the interval beats *dev_bpm*
+    beats per minute. The *checks* are steps whose beat rates can be
+    verified once the step is done. For steps on a full keyboard, the
+    octaves of both notes are given too.
+    """
+
+    def __init__(self, reference, note, semitones, dev_bpm, checks=(),
+                 reference_octave=None, octave=None):
+        self.reference = reference
+        self.note = note
+        self.semitones = semitones
+        self.dev_bpm = dev_bpm
+        self.checks = list(checks)
+        self.reference_octave = reference_octave
+        self.octave = octave
+
+    def __str__(self):
+        """Describe the step.
+
+        >>> print(Step(Note('A'), Note('E'), -5, 0.0, octave=4,
+        ...            checks=[Step(Note('C'), Note('E'), 4, 624.04)]))
+        tune E4 from A (P4 down) at 0.00 bpm, check C-E (M3 up) at 624.04 bpm
+        """
+        def describe(note, octave):
+            return str(note) if octave is None else '%s%i' % (note, octave)
+
+        def describe_interval(step):
+            name = SEMITONE_NAMES.get(abs(step.semitones) % 12, '?')
+            if abs(step.semitones) == 12:
+                name = 'P8'
+            elif abs(step.semitones) > 12:
+                name += '+%i' % (abs(step.semitones) // 12)
+            return '%s %s' % (name, 'up' if step.semitones > 0 else 'down')
+
+        result = 'tune %s from %s (%s) at %.2f bpm' % (
+            describe(self.note, self.octave),
+            describe(self.reference, self.reference_octave),
+            describe_interval(self), self.dev_bpm + 1e-8)
+        for check in self.checks:
+            result += ', check %s-%s (%s) at %.2f bpm' % (
+                describe(check.reference, check.reference_octave),
+                describe(check.note, check.octave),
+                describe_interval(check), check.dev_bpm + 1e-8)
+        return result
+
+
+class Planner:
+    """Plan the tuning of a fully tuned target *temperament*. The cost
+    of a step is one, plus the cost of its interval from *costs*, plus
+    *beat_cost* for every beat per second of the interval, minus
+    *check_bonus* for every check, up to *max_checks* checks.
+    """
+
+    def __init__(self, temperament, costs=INTERVAL_COSTS, beat_cost=0.1,
+                 check_bonus=0.25, max_checks=2):
+        self.temperament = temperament
+        """The target temperament."""
+        self.costs = costs
+        self.beat_cost = beat_cost
+        self.check_bonus = check_bonus
+        self.max_checks = max_checks
+        freqs = [temperament.get_frequency(note)
+                 for note in Temperament.NOTES]
+        self._rates = [[get_beat_rate(freq1, freq2) for freq2 in freqs]
+                       for freq1 in freqs]
+        # bit masks of the positions that can check each position
+        self._check_masks = [
+            sum(1 << position2 for position2 in range(12)
+                if abs(self._rates[position][position2][0])
+                in CHECK_INTERVALS)
+            for position in range(12)]
+        self._plans = {(1 << 12) - 1: (0, None)}
+
+    def _get_cost(self, state, position, position2):
+        """Get the cost of tuning *position2* from *position*, when the
+        positions in the bit mask *state* are tuned, or ``None`` if that
+        is not possible.
+        """
+        semitones, bpm = self._rates[position][position2]
+        if abs(semitones) not in self.costs:
+            return None
+        checks = bin(state & self._check_masks[position2]
+                     & ~(1 << position)).count('1')
+        return (1 + self.costs[abs(semitones)]
+                + self.beat_cost * abs(bpm) / 60
+                - self.check_bonus * min(checks, self.max_checks))
+
+    def _solve(self, state):
+        """Get the cost of the best plan for tuning all positions that
+        are not in the bit mask *state*, and the first step of that
+        plan, as a pair of positions.
+        """
+        try:
+            return self._plans[state]
+        except KeyError:
+            pass
+        best = (np.inf, None)
+        for position in range(12):
+            if not state & (1 << position):
+                continue
+            for position2 in range(12):
+                if state & (1 << position2):
+                    continue
+                cost = self._get_cost(state, position, position2)
+                if cost is None:
+                    continue
+                cost += self._solve(state | (1 << position2))[0]
+                if cost < best[0]:
+                    best = (cost, (position, position2))
+        self._plans[state] = best
+        return best
+
+    def _get_step(self, state, position, position2, octave=None):
+        """Create the step that tunes *position2* from *position*, when
+        the positions in the bit mask *state* are tuned.
+        """
+        notes = Temperament.NOTES
+        semitones, bpm = self._rates[position][position2]
+        checks = [
+            Step(notes[other], notes[position2], *self._rates[other][position2],
+                 reference_octave=octave, octave=octave)
+            for other in range(12)
+            if other != position and state & (1 << other)
+            and self._check_masks[position2] & (1 << other)]
+        return Step(notes[position], notes[position2], semitones, bpm, checks,
+                    octave, octave)
+
+    def get_cost(self, note=Note('A')):
+        """Get the cost of the best plan starting from *note*."""
+        return self._solve(1 << note.position)[0]
+
+    def iter_steps(self, note=Note('A'), octave=None):
+        """Yield the steps of the best plan for tuning the temperament,
+        starting from *note*. If an *octave* is given, then all steps
+        are labelled with it.
+        """
+        state = 1 << note.position
+        while True:
+            cost, positions = self._solve(state)
+            if positions is None:
+                if not np.isfinite(cost):
+                    raise ValueError("Temperament cannot be planned.")
+                return
+            yield self._get_step(state, positions[0], positions[1], octave)
+            state |= 1 << positions[1]
+
+
+def iter_compass_steps(keyboard, octave=4, rank=0):
+    """Yield steps that extend a tuned bearing *octave* of a
+    :class:`kbtune.keyboard.Keyboard` to its full compass, by octaves,
+    towards the treble first and then towards the bass. Target beat
+    rates follow the frequencies of the keyboard. Each step is checked
+    by the thirds, sixths, and tenths with keys that are already
+    tuned.
+
+    >>> from kbtune.keyboard import Keyboard
+    >>> temp = Temperament()
+    >>> temp.set_frequency(Note('Eb'), 145.73388203017834)
+    >>> temp.tune_fifths_up(Note('Eb'), Note('G#'))
+    >>> keyboard = Keyboard()
+    >>> keyboard.set_temperament(temp, octave=3)
+    >>> steps = list(iter_compass_steps(keyboard, octave=3))
+    >>> len(steps)
+    76
+    >>> print(steps[0])  # doctest: +NORMALIZE_WHITESPACE
+    tune C4 from C3 (P8 up) at 0.00 bpm, check Eb3-C4 (M6 up) at 546.50 bpm,
+    check E3-C4 (m6 up) at -922.22 bpm, check G#3-C4 (M3 up) at -66.64 bpm,
+    check A3-C4 (m3 up) at -922.22 bpm
+    >>> print(steps[-1].note, steps[-1].octave)
+    A 0
+    """
+    freqs = keyboard.frequencies[rank]
+    size = len(freqs)
+    bearing = np.nonzero(keyboard.octaves == octave)[0]
+    tuned = np.zeros(size, dtype=bool)
+    tuned[bearing] = True
+    order = ([(key, key - 12) for key in range(bearing[-1] + 1, size)]
+             + [(key, key + 12) for key in range(bearing[0] - 1, -1, -1)])
+    for key, reference in order:
+        checks = []
+        for distance in (-16, -15, -9, -8, -4, -3, 3, 4, 8, 9, 15, 16):
+            other = key + distance
+            if 0 <= other < size and tuned[other]:
+                checks.append(Step(
+                    keyboard.notes[other], keyboard.notes[key],
+                    *get_beat_rate(freqs[other], freqs[key]),
+                    reference_octave=keyboard.octaves[other],
+                    octave=keyboard.octaves[key]))
+        yield Step(keyboard.notes[reference], keyboard.notes[key],
+                   *get_beat_rate(freqs[reference], freqs[key]),
+                   checks=checks, reference_octave=keyboard.octaves[reference],
+                   octave=keyboard.octaves[key])
+        tuned[key] = True
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
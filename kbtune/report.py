@@ -0,0 +1,147 @@
+"""
+:mod:`kbtune.report` -- Reports
+===============================
+
+Reports on the fifths, thirds, and sixths of temperaments, as a stream
+of rows, one for each interval, which can be written to CSV, to JSON
+lines, or collected in a numpy array. Rows are generated one at a
+time, so reports on many temperaments never have to be held in memory
+at once. This module requires numpy.
+
+>>> import io
+>>> temp = Temperament()
+>>> temp.set_frequency(Note('Eb'), 145.73388203017834)
+>>> temp.tune_fifths_up(Note('Eb'), Note('G#'))
+>>> stream = io.StringIO()
+>>> write_csv(stream, iter_rows(temp, ['P5'], name='pythagorean'))
+>>> print(stream.getvalue().splitlines()[6]) # doctest: +ELLIPSIS
+pythagorean,P5,G#,D#,678.49...,-23.46...,-7.95...,-477.18...
+"""
+
+from __future__ import division
+
+import csv
+import json
+
+import numpy as np
+
+from kbtune import Interval, Note, Temperament
+
+INTERVALS = {
+    'P5': Temperament.PERFECT_FIFTH,
+    'M3': Temperament.MAJOR_THIRD,
+    'm3': Interval(Note('C'), Note('Eb')),
+    'M6': Interval(Note('C'), Note('A')),
+    'm6': Interval(Note('C'), Note('Ab')),
+    }
+"""Intervals that can be reported on, by name."""
+
+FIELDS = ('name', 'interval', 'note1', 'note2',
+          'cents', 'dev_cents', 'dev_bps', 'dev_bpm')
+"""Fields of every row."""
+
+DTYPE = [('name', 'U64'), ('interval', 'U4'), ('note1', 'U3'),
+         ('note2', 'U3'), ('cents', float), ('dev_cents', float),
+         ('dev_bps', float), ('dev_bpm', float)]
+"""Type of the numpy arrays returned by :func:`get_array`."""
+
+
+def iter_rows(temperament, intervals=('P5', 'M3', 'm3', 'M6', 'm6'),
+              name=''):
+    """Yield a row for each of the named intervals going up from every
+    note of the temperament, as a dictionary with all :data:`FIELDS`.
+    Notes are given as strings. The *name* identifies the temperament
+    in reports on many temperaments.
+
+    >>> temp = Temperament()
+    >>> temp.set_frequency(Note('C'), 300)
+    >>> temp.tune_major_third_up(Note('C'))
+    Note(key=2)
+    >>> row = next(row for row in iter_rows(temp, ['M3'])
+    ...            if row['note1'] == 'C')
+    >>> print(row['note2'], abs(round(row['dev_cents'], 6)))
+    E 0.0
+
+    Intervals that reach beyond B are measured as by
+    :func:`kbtune.arrays.get_interval_metrics`:
+
+    >>> from kbtune.arrays import get_interval_metrics
+    >>> freqs = [300 * 2 ** (i / 12) for i in range(12)]
+    >>> temp = Temperament()
+    >>> for note, freq in zip(Temperament.NOTES, freqs):
+    ...     temp.set_frequency(note, freq)
+    >>> rows = [row for row in iter_rows(temp, ['M6', 'm6'])
+    ...         if row['note1'] == 'A']
+    >>> [(row['note2'], round(row['dev_bps'], 2)) for row in rows]
+    [('F#', 45.79), ('F', -31.78)]
+    >>> print(np.round(get_interval_metrics(freqs, ['M6', 'm6'])[2][:, 9], 2))
+    [ 45.79 -31.78]
+    """
+    for interval in intervals:
+        for row in temperament.iter_rows(INTERVALS[interval]):
+            row['name'] = name
+            row['interval'] = interval
+            row['note1'] = str(row['note1'])
+            row['note2'] = str(row['note2'])
+            yield row
+
+
+def iter_batch_rows(temperaments, intervals=('P5', 'M3', 'm3', 'M6', 'm6')):
+    """Yield the rows of many temperaments, given as an iterable of
+    names and temperaments.
+    """
+    for name, temperament in temperaments:
+        for row in iter_rows(temperament, intervals, name):
+            yield row
+
+
+def write_csv(stream, rows):
+    """Write rows to a text stream, as comma separated values, with a
+    header.
+    """
+    writer = csv.DictWriter(stream, FIELDS, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def write_jsonl(stream, rows):
+    """Write rows to a text stream, as one JSON object per line.
+
+    >>> import io
+    >>> stream = io.StringIO()
+    >>> write_jsonl(stream, [{'name': 'x', 'cents': 700.0}])
+    >>> stream.getvalue()
+    '{"name": "x", "cents": 700.0}\\n'
+    """
+    for row in rows:
+        stream.write(json.dumps(row))
+        stream.write('\n')
+
+
+def get_array(rows):
+    """Collect rows in a structured numpy array of :data:`DTYPE`.
+    Missing values become ``nan``.
+
+    >>> temp = Temperament()
+    >>> temp.set_frequency(Note('C'), 300)
+    >>> temp.tune_fifths_up(Note('C'), Note('B#'))
+    >>> array = get_array(iter_rows(temp))
+    >>> array.shape
+    (60,)
+    >>> print(array[0]['interval'], array[0]['note1'], array[0]['note2'])
+    P5 A E
+    """
+    nan = float('nan')
+    return np.array(
+        [tuple(nan if row[field] is None else row[field]
+               for field in FIELDS) for row in rows],
+        dtype=DTYPE)
+
+
+def write_npy(filename, rows):
+    """Write rows to a numpy file, as by :func:`get_array`."""
+    np.save(filename, get_array(rows))
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
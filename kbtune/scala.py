@@ -0,0 +1,240 @@
+"""
+:mod:`kbtune.scala` -- Scala files
+==================================
+
+Read and write temperaments as Scala scale (``.scl``) and keyboard
+mapping (``.kbm``) files. Only scales with twelve notes to the pure
+octave, and linear keyboard mappings, are supported. Scales are stored
+as a list of twelve pitches in cents, relative to the base note of the
+scale, starting with ``0.0`` for the base note itself.
+
+>>> import os, tempfile
+>>> temp = Temperament()
+>>> temp.set_frequency(Note('Eb'), 145.73388203017834)
+>>> temp.tune_fifths_up(Note('Eb'), Note('G#'))
+>>> filename = os.path.join(tempfile.mkdtemp(), 'pythagorean.scl')
+>>> write_scl(filename, get_scale(temp), 'Pythagorean')
+>>> description, scale = read_scl(filename)
+>>> description
+'Pythagorean'
+>>> [round(pitch, 2) for pitch in scale[:4]]
+[0.0, 113.69, 203.91, 294.13]
+"""
+
+from __future__ import division
+
+from fractions import Fraction
+import math
+import os
+
+from kbtune import CentsTemperament, Note, Temperament, ratio_to_cents
+
+MIDDLE_NOTE = 60
+"""Midi number of the middle C, the default base note of a scale."""
+
+REFERENCE_NOTE = 69
+"""Midi number of the A above the middle C, the default reference."""
+
+
+def parse_pitch(text):
+    """Parse a pitch of a Scala file into cents. Pitches with a period
+    are in cents, all other pitches are ratios or integers. Anything
+    after the first space is a comment.
+
+    >>> parse_pitch('3/2')  # doctest: +ELLIPSIS
+    701.955...
+    >>> parse_pitch(' 100.0 cents')
+    100.0
+    >>> parse_pitch('2')
+    1200.0
+    """
+    text = text.split()[0]
+    if '.' in text:
+        return float(text)
+    return ratio_to_cents(float(Fraction(text)))
+
+
+def _iter_lines(lines):
+    """Iterate over all lines that are not comments."""
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if not line.startswith('!'):
+            yield line
+
+
+def parse_scl(lines):
+    """Parse the lines of a Scala scale file, and return the description
+    and the scale.
+
+    >>> parse_scl(['! test.scl', 'Equal', ' 12', '!'] + [
+    ...     '%i.' % (100 * i) for i in range(1, 12)] + ['2/1'])
+    ... # doctest: +NORMALIZE_WHITESPACE
+    ('Equal', [0.0, 100.0, 200.0, 300.0, 400.0, 500.0, 600.0, 700.0,
+               800.0, 900.0, 1000.0, 1100.0])
+    """
+    lines = _iter_lines(lines)
+    description = next(lines).strip()
+    size = int(next(lines).split()[0])
+    pitches = [parse_pitch(line) for line in lines if line.strip()]
+    if size != 12 or len(pitches) != 12:
+        raise ValueError("Scale must have twelve notes.")
+    if abs(pitches[-1] - 1200) > 1e-6:
+        raise ValueError("Scale must repeat at the octave.")
+    return description, [0.0] + pitches[:-1]
+
+
+def read_scl(filename):
+    """Read a Scala scale file, and return the description and the
+    scale.
+    """
+    with open(filename) as scl:
+        return parse_scl(scl)
+
+
+def write_scl(filename, scale, description=''):
+    """Write a scale to a Scala scale file."""
+    with open(filename, 'w') as scl:
+        scl.write('! %s\n!\n%s\n 12\n!\n' % (
+            os.path.basename(filename), description))
+        for pitch in scale[1:]:
+            scl.write(' %.5f\n' % pitch)
+        scl.write(' 2/1\n')
+
+
+def read_kbm(filename):
+    """Read a linear Scala keyboard mapping file, and return the midi
+    number of the base note of the scale, the midi number of the
+    reference note, and the frequency of the reference note.
+    """
+    with open(filename) as kbm:
+        values = [line.split()[0] for line in _iter_lines(kbm)
+                  if line.strip()]
+    size = int(values[0])
+    if size and [int(value) for value in values[7:7 + size]] != list(
+            range(size)):
+        raise ValueError("Keyboard mapping must be linear.")
+    return int(values[3]), int(values[4]), float(values[5])
+
+
+def write_kbm(filename, middle=MIDDLE_NOTE, reference=REFERENCE_NOTE,
+              frequency=440):
+    """Write a linear Scala keyboard mapping file, mapping the base note
+    of the scale to the midi number *middle*, and tuning the midi
+    number *reference* at *frequency*.
+    """
+    with open(filename, 'w') as kbm:
+        kbm.write(
+            '! %s\n'
+            '! Size of map:\n0\n'
+            '! First and last midi note number to retune:\n0\n127\n'
+            '! Middle note where the first entry of the mapping is mapped'
+            ' to:\n%i\n'
+            '! Reference note for which frequency is given:\n%i\n'
+            '! Frequency to tune the above note to:\n%.6f\n'
+            '! Scale degree to consider as formal octave:\n12\n'
+            % (os.path.basename(filename), middle, reference, frequency))
+
+
+def get_scale(temperament, note=Note('C')):
+    """Get the scale of a fully tuned temperament, with *note* as base
+    note. The pitches lie in the octave above the base note.
+
+    >>> temp = Temperament()
+    >>> temp.set_frequency(Note('C'), 300)
+    >>> temp.tune_fifths_up(Note('C'), Note('B#'), -1.955)
+    >>> [round(pitch, 3) for pitch in get_scale(temp, Note('A'))[:3]]
+    [0.0, 100.0, 200.0]
+    """
+    base = temperament.get_frequency(note)
+    return [
+        ratio_to_cents(temperament.get_frequency(
+            Temperament.NOTES[(note.position + degree) % 12]) / base) % 1200
+        for degree in range(12)]
+
+
+def get_temperament(scale, middle=MIDDLE_NOTE, reference=REFERENCE_NOTE,
+                    frequency=440):
+    """Create a temperament from a scale and a linear keyboard mapping.
+    The pitches of the temperament are relative to the reference note,
+    at the reference frequency, and lie in the octave of the middle C.
+
+    >>> scale = [100 * i for i in range(12)]
+    >>> temp = get_temperament(scale)
+    >>> temp.get_pitch(Note('A'))
+    0
+    >>> print(round(temp.get_frequency(Note('C')), 2))
+    261.63
+    """
+    temp = CentsTemperament(frequency)
+    offset = scale[(reference - middle) % 12] + 1200 * math.floor(
+        (reference - middle) / 12)
+    for degree, pitch in enumerate(scale):
+        # keys past B lie in the octave above the middle C
+        octave, position = divmod(middle + degree - MIDDLE_NOTE, 12)
+        temp.set_pitch(Temperament.NOTES[position],
+                       pitch - offset - 1200 * octave)
+    return temp
+
+
+def load(scl, kbm=None):
+    """Load a temperament from a Scala scale file, and optionally, a
+    keyboard mapping file. Without keyboard mapping, the scale starts
+    at C, and A is tuned at 440 Hz.
+    """
+    _, scale = read_scl(scl)
+    if kbm is None:
+        return get_temperament(scale)
+    return get_temperament(scale, *read_kbm(kbm))
+
+
+def save(temperament, scl, kbm=None, description='', note=Note('C'),
+         reference=Note('A')):
+    """Save a fully tuned temperament to a Scala scale file, with *note*
+    as base note, and optionally, to a keyboard mapping file that tunes
+    *reference* at its frequency in the temperament. The base note is
+    mapped to the midi number in the octave of the middle C.
+
+    >>> import os, tempfile
+    >>> folder = tempfile.mkdtemp()
+    >>> scl = os.path.join(folder, 'test.scl')
+    >>> kbm = os.path.join(folder, 'test.kbm')
+    >>> temp = Temperament()
+    >>> temp.set_frequency(Note('Eb'), 145.73388203017834)
+    >>> temp.tune_fifths_up(Note('Eb'), Note('G#'))
+    >>> save(temp, scl, kbm)
+    >>> temp2 = load(scl, kbm)
+    >>> print(round(temp2.get_frequency(Note('Eb')), 6))
+    145.733882
+    >>> print(round(temp2.get_dev_cents(Note('G#'), Note('D#')), 2))
+    -23.46
+    >>> save(temp, scl, kbm, note=Note('A'))
+    >>> temp2 = load(scl, kbm)
+    >>> print(round(temp2.get_frequency(Note('C')), 6))
+    122.962963
+    >>> print(round(temp2.get_cents(Note('A'), Note('C')), 2))
+    -905.87
+    """
+    write_scl(scl, get_scale(temperament, note), description)
+    if kbm is not None:
+        middle = MIDDLE_NOTE + note.position
+        write_kbm(kbm, middle,
+                  middle + (reference.position - note.position) % 12,
+                  temperament.get_frequency(reference))
+
+
+def iter_scl(filenames):
+    """Read many Scala scale files, and yield the name (the file name
+    without extension), the description, and the scale of each. Files
+    that do not hold twelve note octave scales are skipped.
+    """
+    for filename in filenames:
+        try:
+            description, scale = read_scl(filename)
+        except (ValueError, StopIteration):
+            continue
+        name = os.path.splitext(os.path.basename(filename))[0]
+        yield name, description, scale
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,245 @@
+"""
+:mod:`kbtune.search` -- Search for well temperaments
+====================================================
+
+Exhaustive search over all ways of distributing a comma over the
+twelve fifths in given fractions, such as 1/4, 1/6, or 1/12 comma.
+Distributions that are rotations (transpositions) or reflections
+(inversions) of each other are only generated once, candidates are
+scored in batches, and the work is spread over a pool of processes.
+Scores in cents are the same for all rotations and reflections, so
+only one of them is scored. Beat rates depend on the absolute pitch,
+so for scores in beats all rotations and reflections are scored.
+This module requires numpy.
+
+>>> results = search([0, Fraction(1, 4)], 'pythagorean',
+...                  score='M3_rms_bps', top=3, processes=1)
+>>> for score, fractions in results:
+...     print(round(score, 2), ' '.join(str(f) for f in fractions))
+13.56 0 0 0 0 0 1/4 1/4 1/4 0 0 0 1/4
+13.59 0 0 0 0 0 0 1/4 1/4 0 0 1/4 1/4
+13.6 0 0 0 0 0 1/4 1/4 1/4 1/4 0 0 0
+"""
+
+from __future__ import division
+
+import concurrent.futures
+from fractions import Fraction
+import heapq
+import math
+import os
+
+import numpy as np
+
+from kbtune import Temperament
+from kbtune.batch import CIRCLE, TemperamentBatch
+
+COMMAS = {
+    'pythagorean': Temperament.PYTHAGOREAN_COMMA,
+    'syntonic': Temperament.SYNTONIC_COMMA,
+    }
+"""Commas that can be distributed, in cents."""
+
+
+def _is_canonical(values, reflections):
+    """Check whether the tuple of values is the largest among all its
+    rotations and, if *reflections* is true, all its reflections.
+    """
+    size = len(values)
+    doubled = values + values
+    for i in range(1, size):
+        if doubled[i:i + size] > values:
+            return False
+    if reflections:
+        doubled = doubled[::-1]
+        for i in range(size):
+            if doubled[i:i + size] > values:
+                return False
+    return True
+
+
+def iter_distributions(numerators, total, prefix=(), rotations=True,
+                       reflections=True):
+    """Iterate over all tuples of twelve numerators, in circle of fifths
+    order starting from C, that start with *prefix* and add up to
+    *total*. If *rotations* is true, then only the tuple that is the
+    largest of all its rotations is generated, and likewise for
+    *reflections*.
+
+    >>> len(list(iter_distributions([0, 1], 3, rotations=False)))
+    220
+    >>> len(list(iter_distributions([0, 1], 3)))
+    12
+    >>> list(iter_distributions([0, 1, 2], 3, prefix=(2, 0, 0)))
+    ... # doctest: +NORMALIZE_WHITESPACE
+    [(2, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0),
+     (2, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0),
+     (2, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0),
+     (2, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0)]
+    """
+    numerators = sorted(set(numerators), reverse=True)
+    prefix = tuple(prefix)
+
+    def extend(values, remaining):
+        left = 12 - len(values)
+        if not left:
+            if not remaining and (
+                    not rotations or _is_canonical(values, reflections)):
+                yield values
+            return
+        for numerator in numerators:
+            # with rotations, the first value is the largest one
+            if rotations and values and numerator > values[0]:
+                continue
+            rest = remaining - numerator
+            largest = values[0] if rotations and values else numerators[0]
+            smallest = numerators[-1]
+            if smallest * (left - 1) <= rest <= largest * (left - 1):
+                for result in extend(values + (numerator,), rest):
+                    yield result
+
+    return extend(prefix, total - sum(prefix))
+
+
+def get_deviations(distributions, denominator, comma):
+    """Convert numerators of fractions of *comma* (in cents), in circle
+    of fifths order, into deviations of the fifths (in cents), by
+    position. Whatever remains of the Pythagorean comma is spread
+    evenly over all fifths.
+
+    >>> deviations = get_deviations([(1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0)],
+    ...                             4, Temperament.SYNTONIC_COMMA)
+    >>> print(np.round(deviations, 2))
+    [[-5.54 -0.16 -5.54 -0.16 -0.16 -0.16 -0.16 -5.54 -0.16 -5.54 -0.16 -0.16]]
+    """
+    tempering = (np.asarray(distributions, dtype=float)
+                 * (-comma / denominator))
+    residual = -Temperament.PYTHAGOREAN_COMMA - np.sum(
+        tempering, axis=-1, keepdims=True)
+    deviations = np.empty(tempering.shape)
+    deviations[..., CIRCLE] = tempering + residual / 12
+    return deviations
+
+
+def _is_invariant(score):
+    """Check whether a score is the same for all rotations and
+    reflections of a distribution, which holds for scores in cents.
+    """
+    names = [score] if isinstance(score, str) else list(score)
+    return all(name.endswith('_cents') for name in names)
+
+
+def _expand(chunk, rotations, reflections):
+    """Get all distinct rotations and reflections of the distributions
+    in a chunk, as far as they were left out by *rotations* and
+    *reflections*.
+
+    >>> chunk = np.array([(1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)])
+    >>> len(_expand(chunk, True, True))
+    12
+    >>> len(_expand(np.array([(1, 0, 1) + (0,) * 9]), True, True))
+    12
+    >>> len(_expand(np.array([(1, 1, 0) + (1,) + (0,) * 8]), True, True))
+    24
+    """
+    if not rotations:
+        return chunk
+    columns = np.arange(12)
+    orders = [(columns + shift) % 12 for shift in range(12)]
+    if reflections:
+        orders += [order[::-1] for order in orders]
+    return np.unique(
+        np.concatenate([chunk[:, order] for order in orders]), axis=0)
+
+
+def _get_scores(deviations, score):
+    """Evaluate the score of a batch of fifth deviations."""
+    scores = TemperamentBatch(deviations).get_scores()
+    if isinstance(score, str):
+        return scores[score]
+    return sum(weight * scores[name] for name, weight in score.items())
+
+
+def _search_prefix(prefix, numerators, denominator, comma, score, top,
+                   rotations, reflections, chunk_size):
+    """Search all distributions starting with *prefix*, and return the
+    *top* best as a sorted list of score and numerators.
+    """
+    best_scores = np.empty(0)
+    best = np.empty((0, 12), dtype=int)
+    distributions = iter_distributions(
+        numerators, denominator, prefix, rotations, reflections)
+    while True:
+        chunk = np.array(
+            [values for values, _ in zip(distributions, range(chunk_size))],
+            dtype=int).reshape(-1, 12)
+        if not len(chunk):
+            break
+        if not _is_invariant(score):
+            chunk = _expand(chunk, rotations, reflections)
+        scores = _get_scores(
+            get_deviations(chunk, denominator, comma), score)
+        best_scores = np.concatenate([best_scores, scores])
+        best = np.concatenate([best, chunk])
+        if len(best) > top:
+            keep = np.argpartition(best_scores, top)[:top]
+            best_scores, best = best_scores[keep], best[keep]
+    order = np.argsort(best_scores, kind='stable')
+    return [(float(best_scores[i]), tuple(int(x) for x in best[i]))
+            for i in order]
+
+
+def search(fractions, comma='pythagorean', score='M3_rms_cents', top=10,
+           processes=None, rotations=True, reflections=True,
+           chunk_size=4096):
+    """Search all distributions of one *comma* over the twelve fifths,
+    where each fifth is narrowed by one of the given *fractions* of
+    the comma, and yield the *top* best ones, with the lowest score
+    first. The remainder of the Pythagorean comma, if any, is spread
+    evenly over all fifths.
+
+    The *score* is the name of a field of
+    :meth:`kbtune.batch.TemperamentBatch.get_scores`, or a dictionary
+    mapping such names to weights. The search runs in a pool of
+    *processes* (by default, one per cpu); use ``processes=1`` to search
+    in the current process. Each result is the score, together with the
+    fractions of the fifths going up from each note in
+    :attr:`Temperament.NOTES`. Scores that are not in cents are
+    evaluated for all rotations and reflections of each distribution,
+    even when *rotations* and *reflections* are true, since those only
+    reduce the number of distributions that are generated.
+    """
+    fractions = [Fraction(fraction) for fraction in fractions]
+    denominator = 1
+    for fraction in fractions:
+        denominator *= (
+            fraction.denominator
+            // math.gcd(denominator, fraction.denominator))
+    numerators = sorted(
+        set(int(fraction * denominator) for fraction in fractions),
+        reverse=True)
+    # one task for every possible start of the distribution
+    prefixes = [
+        (first, second)
+        for first in numerators for second in numerators
+        if not rotations or second <= first]
+    args = (numerators, denominator, COMMAS[comma], score, top,
+            rotations, reflections, chunk_size)
+    if processes == 1:
+        results = [_search_prefix(prefix, *args) for prefix in prefixes]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                processes or os.cpu_count()) as executor:
+            futures = [executor.submit(_search_prefix, prefix, *args)
+                       for prefix in prefixes]
+            results = [future.result() for future in futures]
+    merged = heapq.merge(*results)
+    for _, (value, distribution) in zip(range(top), merged):
+        by_position = [None] * 12
+        for position, numerator in zip(CIRCLE, distribution):
+            by_position[position] = Fraction(numerator, denominator)
+        yield value, tuple(by_position)
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
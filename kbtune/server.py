@@ -0,0 +1,339 @@
+"""
+:mod:`kbtune.server` -- Tuning session server
+=============================================
+
+A server that holds live temperaments, in named sessions, which any
+number of clients can tune and follow at once. Clients connect over
+TCP, and send and receive JSON objects, one per line. Every message
+has a ``"type"``, and most name a ``"session"``:
+
+* ``subscribe`` and ``unsubscribe``: start or stop receiving the state
+  of the session after every change. A session is created when it is
+  first named.
+* ``set_frequency``: tune a ``"note"`` at a ``"frequency"``.
+* ``set_scale``: replace the temperament by a ``"scale"`` (as in
+  :mod:`kbtune.scala`), with an optional reference ``"note"`` and
+  ``"frequency"``.
+* ``tune``: take a tuning ``"step"``, which is ``"fifth_up"``,
+  ``"fifths_up"`` (up to the note ``"to"``), or ``"major_third_up"``,
+  from a ``"note"``, with an optional deviation in ``"cents"``.
+* ``get``: get the state of the session once.
+
+The state of a session holds the frequencies of all notes, and a row
+for every fifth and major third, as in :func:`kbtune.report.iter_rows`.
+Each change is pushed to all subscribers, through a queue per client,
+so a slow client only ever delays itself: when its queue is full, the
+oldest state is dropped. All clients are served by a single event
+loop. This module requires numpy.
+
+>>> async def demo():
+...     server = Server()
+...     tcp = await server.start('127.0.0.1', 0)
+...     port = tcp.sockets[0].getsockname()[1]
+...     reader, writer = await asyncio.open_connection('127.0.0.1', port)
+...     for message in [
+...             {'type': 'subscribe', 'session': 'organ'},
+...             {'type': 'set_frequency', 'session': 'organ',
+...              'note': 'Eb', 'frequency': 145.73388203017834},
+...             {'type': 'tune', 'session': 'organ', 'step': 'fifths_up',
+...              'note': 'Eb', 'to': 'G#'}]:
+...         writer.write(json.dumps(message).encode('utf-8') + b'\\n')
+...     for i in range(3):
+...         state = json.loads((await reader.readline()).decode('utf-8'))
+...     writer.close()
+...     await writer.wait_closed()
+...     tcp.close()
+...     await server.close()
+...     await tcp.wait_closed()
+...     return state
+>>> state = asyncio.run(demo())
+>>> state['version'], round(state['frequencies']['A'], 6)
+(2, 207.5)
+>>> row = state['rows'][5]
+>>> row['note1'], row['note2'], round(row['dev_bpm'], 2)
+('G#', 'D#', -477.19)
+"""
+
+from __future__ import division
+
+import argparse
+import asyncio
+import json
+
+from kbtune import CentsTemperament, Note, Temperament
+from kbtune.report import iter_rows
+from kbtune.scala import get_temperament
+
+INTERVALS = ('P5', 'M3')
+"""Intervals reported in the state of a session."""
+
+STEPS = ('fifth_up', 'fifths_up', 'major_third_up')
+"""Tuning steps accepted by ``tune`` messages."""
+
+CLOSE_TIMEOUT = 1.0
+"""Seconds to wait for the messages queued for a client to be sent, once
+it disconnects.
+"""
+
+
+def _get_field(message, name):
+    """Get a field of a message."""
+    try:
+        return message[name]
+    except KeyError:
+        raise ValueError("Missing field '%s'." % name)
+
+
+def _get_note(message, name='note'):
+    """Get a note from a field of a message."""
+    try:
+        return Note(str(_get_field(message, name)))
+    except (KeyError, IndexError):
+        raise ValueError("Unknown note '%s'." % message[name])
+
+
+class Session:
+    """A live temperament, shared by all clients that name it."""
+
+    def __init__(self, name, reference=440):
+        self.name = name
+        self.temperament = CentsTemperament(reference)
+        """The temperament."""
+        self.subscribers = set()
+        """Clients that receive the state after every change."""
+        self.version = 0
+        """Number of changes so far."""
+
+    def get_state(self):
+        """Get the state of the session, as a JSON serializable
+        dictionary.
+        """
+        temp = self.temperament
+        return {
+            'type': 'state',
+            'session': self.name,
+            'version': self.version,
+            'frequencies': dict(
+                (str(note), temp.get_frequency(note)
+                 if temp.is_tuned(note.position) else None)
+                for note in Temperament.NOTES),
+            'rows': list(iter_rows(temp, INTERVALS, self.name)),
+            }
+
+    def set_frequency(self, note, frequency):
+        """Tune a note at a frequency."""
+        if not frequency > 0:
+            raise ValueError("Frequency must be positive.")
+        self.temperament.set_frequency(note, frequency)
+
+    def set_scale(self, scale, note=Note('A'), frequency=440):
+        """Replace the temperament by a scale, with *note* tuned at
+        *frequency*.
+        """
+        if len(scale) != 12:
+            raise ValueError("Scale must have twelve pitches.")
+        self.temperament = get_temperament(
+            scale, reference=60 + note.position, frequency=frequency)
+
+    def tune(self, step, note, cents=0, to=None):
+        """Take a tuning step from a note that is already tuned."""
+        temp = self.temperament
+        if step not in STEPS:
+            raise ValueError("Unknown step '%s'." % step)
+        if not temp.is_tuned(note.position):
+            raise ValueError("Note %s is not tuned." % note)
+        if step == 'fifth_up':
+            temp.tune_fifth_up(note, cents)
+        elif step == 'fifths_up':
+            if to is None:
+                raise ValueError("Missing field 'to'.")
+            # check first, since tuning would never end otherwise
+            next_note = note
+            for i in range(12):
+                if next_note == to:
+                    break
+                next_note = next_note + Temperament.PERFECT_FIFTH
+            else:
+                raise ValueError("Note %s lies more than twelve fifths up "
+                                 "from %s." % (to, note))
+            temp.tune_fifths_up(note, to, cents)
+        else:
+            temp.tune_major_third_up(note, cents)
+
+
+class _Client:
+    """A connected client, with a queue of lines to send."""
+
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.queue = asyncio.Queue(queue_size)
+        self.sessions = set()
+
+    def send(self, data):
+        """Queue a line, dropping the oldest line if the queue is
+        full.
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(data)
+
+    async def run(self):
+        """Send queued lines, until ``None`` is queued."""
+        while True:
+            data = await self.queue.get()
+            if data is None:
+                return
+            self.writer.write(data)
+            await self.writer.drain()
+
+
+class Server:
+    """A server of tuning sessions. Every client has a queue of at most
+    *queue_size* messages waiting to be sent.
+    """
+
+    def __init__(self, queue_size=64):
+        self.queue_size = queue_size
+        self.sessions = {}
+        """Sessions, by name."""
+        self._clients = set()
+        """Connected clients."""
+        self._tasks = set()
+        """Tasks serving the connected clients."""
+
+    def get_session(self, name):
+        """Get a session, creating it if needed."""
+        try:
+            return self.sessions[name]
+        except KeyError:
+            session = self.sessions[name] = Session(name)
+            return session
+
+    def _publish(self, session):
+        """Send the state of a session to all its subscribers."""
+        session.version += 1
+        data = self._encode(session.get_state())
+        for client in session.subscribers:
+            client.send(data)
+
+    @staticmethod
+    def _encode(message):
+        return json.dumps(message).encode('utf-8') + b'\n'
+
+    def handle_message(self, client, message):
+        """Handle a message from a client, and return the reply, if any.
+        Changes are published to all subscribers instead.
+        """
+        kind = _get_field(message, 'type')
+        session = self.get_session(str(_get_field(message, 'session')))
+        if kind == 'subscribe':
+            session.subscribers.add(client)
+            client.sessions.add(session)
+            return session.get_state()
+        elif kind == 'unsubscribe':
+            session.subscribers.discard(client)
+            client.sessions.discard(session)
+            return None
+        elif kind == 'get':
+            return session.get_state()
+        elif kind == 'set_frequency':
+            session.set_frequency(
+                _get_note(message), float(_get_field(message, 'frequency')))
+        elif kind == 'set_scale':
+            session.set_scale(
+                [float(pitch) for pitch in _get_field(message, 'scale')],
+                _get_note(message) if 'note' in message else Note('A'),
+                float(message.get('frequency', 440)))
+        elif kind == 'tune':
+            session.tune(
+                _get_field(message, 'step'), _get_note(message),
+                float(message.get('cents', 0)),
+                _get_note(message, 'to') if 'to' in message else None)
+        else:
+            raise ValueError("Unknown message type '%s'." % kind)
+        self._publish(session)
+        if client not in session.subscribers:
+            return session.get_state()
+        return None
+
+    async def handle_client(self, reader, writer):
+        """Serve a single client, until it disconnects."""
+        client = _Client(writer, self.queue_size)
+        task = asyncio.current_task()
+        self._clients.add(client)
+        self._tasks.add(task)
+        sender = asyncio.ensure_future(client.run())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    message = json.loads(line.decode('utf-8'))
+                    if not isinstance(message, dict):
+                        raise ValueError("Message must be an object.")
+                    reply = self.handle_message(client, message)
+                except (ValueError, TypeError) as error:
+                    reply = {'type': 'error', 'message': str(error)}
+                if reply is not None:
+                    client.send(self._encode(reply))
+        except (ConnectionError, asyncio.CancelledError):
+            # a cancelled client, as by close(), is disconnected as usual
+            pass
+        finally:
+            self._clients.discard(client)
+            for session in client.sessions:
+                session.subscribers.discard(client)
+            # let queued messages go out before closing, unless the client
+            # stopped reading them
+            client.send(None)
+            try:
+                await asyncio.wait_for(sender, CLOSE_TIMEOUT)
+            except (asyncio.TimeoutError, ConnectionError):
+                pass
+            writer.close()
+            self._tasks.discard(task)
+
+    async def close(self):
+        """Disconnect all clients, and wait until they are served."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def start(self, host='127.0.0.1', port=8765):
+        """Start serving, and return the :class:`asyncio.Server`."""
+        return await asyncio.start_server(self.handle_client, host, port)
+
+
+async def serve(host='127.0.0.1', port=8765, queue_size=64):
+    """Serve tuning sessions until cancelled."""
+    server = Server(queue_size)
+    tcp = await server.start(host, port)
+    try:
+        async with tcp:
+            await tcp.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None, prog=None):
+    """Run the server from the command line."""
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Serve tuning sessions.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--queue-size', type=int, default=64,
+                        help="largest number of messages queued per client")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.queue_size))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,165 @@
+"""
+:mod:`kbtune.synth` -- Audio previews
+=====================================
+
+Render notes, intervals, chords, and the circle of fifths of a
+temperament as audio. Each note is a sum of partials, optionally
+stretched by inharmonicity, so intervals beat exactly as the
+temperament predicts. Audio is computed in chunks and written straight
+into a memory mapped 16 bit WAV file, so long renderings never have to
+fit in memory. This module requires numpy.
+
+>>> import os, tempfile
+>>> temp = Temperament()
+>>> temp.set_frequency(Note('Eb'), 145.73388203017834)
+>>> temp.tune_fifths_up(Note('Eb'), Note('G#'))
+>>> filename = os.path.join(tempfile.mkdtemp(), 'circle.wav')
+>>> events = get_circle_events(temp, duration=0.5, gap=0.1)
+>>> render(filename, events, samplerate=8000)
+>>> from kbtune.analysis import get_wav_samplerate, iter_wav_blocks
+>>> get_wav_samplerate(filename)
+8000
+>>> sum(len(block) for block in iter_wav_blocks(filename, 4096))
+56800
+"""
+
+from __future__ import division
+
+import math
+import struct
+
+import numpy as np
+
+from kbtune import Note, Temperament
+from kbtune.piano import get_partials
+
+PARTIALS = (1, 1 / 2, 1 / 3, 1 / 4, 1 / 5, 1 / 6)
+"""Default amplitudes of the partials of every note."""
+
+
+def create_wav(filename, frames, samplerate=44100):
+    """Create a mono 16 bit PCM WAV file with the given number of
+    (silent) frames, and return its samples as a writable numpy
+    memory map.
+
+    >>> import os, tempfile
+    >>> filename = os.path.join(tempfile.mkdtemp(), 'silence.wav')
+    >>> data = create_wav(filename, 100)
+    >>> data.shape, data.dtype.str
+    ((100,), '<i2')
+    >>> os.path.getsize(filename)
+    244
+    """
+    size = 2 * frames
+    header = (
+        b'RIFF' + struct.pack('<I', 36 + size) + b'WAVE'
+        + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, 1, samplerate,
+                                2 * samplerate, 2, 16)
+        + b'data' + struct.pack('<I', size))
+    with open(filename, 'wb') as wav:
+        wav.write(header)
+        wav.truncate(len(header) + size)
+    return np.memmap(filename, dtype='<i2', mode='r+', offset=len(header),
+                     shape=(frames,))
+
+
+def render_tones(data, start, frequencies, duration, samplerate=44100,
+                 partials=PARTIALS, inharmonicity=0, volume=0.5,
+                 fade=0.01, chunk_size=16384):
+    """Add tones of the given frequencies, lasting *duration* seconds,
+    to the 16 bit samples *data* (such as a memory map from
+    :func:`create_wav`), starting at frame *start*. Each tone sums
+    the given *partials*, and the tones are scaled so that their sum
+    never exceeds *volume*. Tones fade in and out over *fade* seconds.
+    """
+    frequencies = np.asarray(frequencies, dtype=float).reshape(-1, 1)
+    amplitudes = np.asarray(partials, dtype=float)
+    harmonics = np.arange(1, len(amplitudes) + 1)
+    partial_freqs = get_partials(
+        frequencies, harmonics, inharmonicity).ravel()
+    partial_amps = np.tile(amplitudes, len(frequencies)) * (
+        volume / (len(frequencies) * np.sum(amplitudes)))
+    frames = min(int(round(duration * samplerate)), len(data) - start)
+    fade_frames = max(int(fade * samplerate), 1)
+    for offset in range(0, frames, chunk_size):
+        index = np.arange(offset, min(offset + chunk_size, frames))
+        time = index[:, np.newaxis] / samplerate
+        signal = np.sin(2 * np.pi * partial_freqs * time).dot(partial_amps)
+        signal *= np.minimum(
+            1, np.minimum(index + 1, frames - index) / fade_frames)
+        target = data[start + index[0]:start + index[-1] + 1]
+        target[:] = np.clip(
+            target + np.round(signal * 32767), -32768, 32767)
+
+
+def render(filename, events, samplerate=44100, **kwargs):
+    """Render a sequence of events into a WAV file. Each event is a
+    tuple of start time (in seconds), duration (in seconds), and a list
+    of frequencies to play together. Further keyword arguments are
+    passed to :func:`render_tones`.
+    """
+    events = list(events)
+    end = max([start + duration for start, duration, _ in events] or [0])
+    data = create_wav(filename, int(math.ceil(end * samplerate)), samplerate)
+    for start, duration, frequencies in events:
+        render_tones(data, int(round(start * samplerate)), frequencies,
+                     duration, samplerate, **kwargs)
+    data.flush()
+    del data
+
+
+def get_chord_events(temperament, chords, duration=2, gap=0.5, octave=0,
+                     start=0):
+    """Get events for playing the given chords (lists of notes, such as
+    an interval or a triad) one after the other, in the temperament,
+    transposed by *octave* octaves.
+
+    >>> temp = Temperament()
+    >>> temp.set_frequency(Note('C'), 260)
+    >>> temp.tune_major_third_up(Note('C'))
+    Note(key=2)
+    >>> for event in get_chord_events(temp, [[Note('C'), Note('E')]],
+    ...                               octave=1):
+    ...     print(event[0], event[1], np.round(event[2], 2))
+    0 2 [520. 650.]
+    """
+    scale = 2 ** octave
+    for chord in chords:
+        yield start, duration, [
+            scale * temperament.get_frequency(note) for note in chord]
+        start += duration + gap
+
+
+def get_circle_events(temperament, duration=2, gap=0.5, octave=0,
+                      start=0):
+    """Get events for playing all twelve fifths of the temperament, in
+    the order of the circle of fifths starting from A, as in
+    :meth:`Temperament.__str__`.
+    """
+    chords = []
+    note = Note('A')
+    for _ in range(12):
+        next_note = note + Temperament.PERFECT_FIFTH
+        chords.append([note, next_note])
+        note = Temperament.NOTES[next_note.position]
+    return get_chord_events(
+        temperament, chords, duration, gap, octave, start)
+
+
+def render_temperaments(filename, temperaments, duration=2, gap=0.5,
+                        pause=2, octave=0, samplerate=44100, **kwargs):
+    """Render the circle of fifths of many temperaments, one after the
+    other with a *pause* in between, into a single WAV file.
+    """
+    def events():
+        start = 0
+        for temperament in temperaments:
+            for event in get_circle_events(
+                    temperament, duration, gap, octave, start):
+                yield event
+            start += 12 * (duration + gap) - gap + pause
+    render(filename, events(), samplerate, **kwargs)
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
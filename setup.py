@@ -15,6 +15,7 @@ setup(
     url='http://github.com/mcmtroffaes/kbtune',
     platforms='any',
     packages=['kbtune'],
+    scripts=['scripts/kbtune'],
     classifiers=[
         'Development Status :: 4 - Beta',
         'Environment :: Console',